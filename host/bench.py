@@ -0,0 +1,378 @@
+# per-driver benchmark using the host stand-in bus layer
+#
+# Each driver primitive is called repeatedly against the fake buses and the
+# following metrics are recorded per call
+#   time_us       - minimum wall time (us)
+#   transactions  - bus transactions (writes)
+#   bytes         - bytes written to the bus
+#   toggles       - output pin level changes (CS, DC, ...)
+#   alloc         - heap bytes allocated (tracemalloc peak on CPython,
+#                   gc.mem_alloc() delta on MicroPython)
+#
+# The results are written to a json file and compared to a stored baseline.
+# The run fails (exit code 1) if a metric exceeds the baseline by more than
+# the threshold. Wall time varies between hosts and runs and has its own
+# (larger) threshold.
+#
+#   python host/bench.py                        compare with host/bench_baseline.json
+#   python host/bench.py --update               store the results as the new baseline
+#   python host/bench.py --driver st7735 --driver sh1106
+#
+# Options
+#   --driver name          only run the given driver(s), all if not defined
+#   --output file          result file, bench_output.json if not defined
+#   --baseline file        baseline file, host/bench_baseline.json if not defined
+#   --threshold pct        allowed increase of the bus and heap metrics, 5 if not defined
+#   --time-threshold pct   allowed increase of the wall time, 50 if not defined
+#   --min-time ms          minimum measurement time per primitive, 20 if not defined
+#   --update               write the results to the baseline file
+#
+# Notes
+#   Drivers are configured with src/hw_pico.cfg and the default display
+#   configuration files. Time regressions of less than 10us are ignored.
+
+import sys
+import json
+import time
+import io
+import gc
+import mphost
+
+mphost.install()
+
+from buslog import LOG
+
+_ROOT = mphost._root()
+
+# time regressions below this value (us) are ignored
+_TIME_NOISE_US = 10
+
+# maximum calls per primitive
+_MAX_CALLS = 1000
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# Return the configuration used to create a DAL
+def _config(display_cfg):
+    cfg = {}
+    for name in ('hw_pico.cfg', display_cfg):
+        with open(f'{_ROOT}/src/{name}', 'r') as fd:
+            cfg |= json.load(fd)
+    return cfg
+
+# Minimal 2 bit per pixel bitmap module for ST7789.bitmap()
+class _Bitmap:
+    WIDTH = 16
+    HEIGHT = 16
+    BPP = 2
+    COLORS = 4
+    PALETTE = (0x0000, 0xF800, 0x07E0, 0x001F)
+    BITMAP = bytes([(i * 0x1B) & 0xFF for i in range(16 * 16 * 2 // 8)])
+
+# Analog clock hand for ST7789.polygon() and fill_polygon()
+_HAND = [(0, -60), (6, 0), (0, 10), (-6, 0), (0, -60)]
+
+# Frame, digit block and text composed in a 64x32 tile, 64x64 region (2 bands)
+def _tile_op(d):
+    from tile import Tile
+    tile = Tile(d, 64, 32)
+    def draw(t):
+        t.rect(0, 0, 64, 64, d.WHITE)
+        t.fill_rect(4, 4, 24, 24, d.RED)
+        t.fill_rect(36, 36, 24, 24, d.GREEN)
+        t.text('12', 8, 40, d.BLUE)
+    return ('tile', lambda: tile.compose(0, 0, 64, 64, draw, d.BLACK), None)
+
+# Smooth scroll step of a 40 row ticker band, a new line is queued when idle
+def _ticker_op(d):
+    from ticker import Ticker
+    ticker = Ticker(d, 100, 40, d.WHITE, d.BLACK)
+    def setup():
+        if not ticker.busy():
+            ticker.add('NTP sync ok')
+    return ('ticker', lambda: ticker.step(), setup)
+
+# 120x40 4 color RLE image (clock face band) streamed from a binary file
+def _rle_op(d):
+    from rleimage import RLEImage
+    from rleconv import encode
+    pixels = []
+    for y in range(40):
+        for x in range(120):
+            pixels.append(d.WHITE if (x // 8 + y // 8) % 5 == 0 else d.BLUE if y < 20 else d.BLACK)
+    pixels[100:110] = [d.RED] * 10
+    image = RLEImage(io.BytesIO(encode(120, 40, pixels)))
+    return ('rle_image', lambda: image.draw(d, 0, 120), None)
+
+# Primitive calls per driver
+#   (name, call, setup) - setup is called before each call and not measured
+def _st7789_ops(d):
+    import vga1_8x8
+    import vga1_16x16
+    import NotoSans_32
+    c = d.RED
+    # 240x40 2 bit per pixel image streamed from a binary file
+    image = io.BytesIO(bytes([(i * 0x1B) & 0xFF for i in range(240 * 40 * 2 // 8)]))
+    return [
+        ('fill', lambda: d.fill(c), None),
+        ('fill_rect', lambda: d.fill_rect(10, 10, 40, 30, c), None),
+        ('hline', lambda: d.hline(0, 20, 100, c), None),
+        ('vline', lambda: d.vline(20, 0, 100, c), None),
+        ('line', lambda: d.line(0, 0, 99, 60, c), None),
+        ('polygon', lambda: d.polygon(_HAND, 120, 160, c, 0.5), None),
+        ('fill_polygon', lambda: d.fill_polygon(_HAND, 120, 160, c, 0.5), None),
+        ('pixel', lambda: d.pixel(5, 5, c), None),
+        ('text8', lambda: d.text(vga1_8x8, 'BCD 12:34', 0, 0, c), None),
+        ('text16', lambda: d.text(vga1_16x16, 'BCD 12:34', 0, 40, c), None),
+        ('write', lambda: d.write(NotoSans_32, 'BCD 12', 0, 80, c), None),
+        ('bitmap', lambda: d.bitmap(_Bitmap, 100, 100), None),
+        ('bitmap_file', lambda: d.bitmap_file(image, 0, 120, 240, 40, 2, _Bitmap.PALETTE),
+         lambda: image.seek(0)),
+        _tile_op(d),
+        _ticker_op(d),
+        _rle_op(d),
+        ('show', lambda: d.show(), None),
+        ('xy_set', lambda: d.xy_set(3, 2, c), None),
+        ('dot_set', lambda: d.dot_set(2, 1, c), None),
+    ]
+
+def _st7735_ops(d):
+    import sysfont
+    c = d.RED
+    return [
+        ('fill', lambda: d.fill(c), None),
+        ('fill_rect', lambda: d.fill_rect((10, 10), (40, 30), c), None),
+        ('hline', lambda: d.hline(0, 20, 100, c), None),
+        ('vline', lambda: d.vline(20, 0, 100, c), None),
+        ('line', lambda: d.line((0, 0), (99, 60), c), None),
+        ('pixel', lambda: d.pixel((5, 5), c), None),
+        ('circle', lambda: d.circle((64, 80), 50, c), None),
+        ('fillcircle', lambda: d.fillcircle((64, 80), 6, c), None),
+        ('text', lambda: d.text((0, 0), 'BCD 12:34', c, sysfont.sysfont), None),
+        ('text3', lambda: d.text((0, 40), '12:34', c, sysfont.sysfont, 3), None),
+        ('text_batch', lambda: d.text((0, 80), 'BCD 12:34', c, sysfont.sysfont, batch=True),
+         None),
+        _tile_op(d),
+        _ticker_op(d),
+        _rle_op(d),
+        ('show', lambda: d.show(), None),
+        ('xy_set', lambda: d.xy_set(3, 2, c), None),
+        ('dot_set', lambda: d.dot_set(2, 1, c), None),
+    ]
+
+def _oled_ops(d):
+    return [
+        ('fill', lambda: d.fill(1), None),
+        ('fill_rect', lambda: d.fill_rect(10, 10, 40, 30, 1), None),
+        ('hline', lambda: d.hline(0, 20, 100, 1), None),
+        ('vline', lambda: d.vline(20, 0, 60, 1), None),
+        ('line', lambda: d.line(0, 0, 99, 60, 1), None),
+        ('pixel', lambda: d.pixel(5, 5, 1), None),
+        ('text', lambda: d.text('BCD 12:34', 0, 0, 1), None),
+        # one virtual pixel changed per frame
+        ('show', lambda: d.show(), lambda: d.xy_set(3, 2, 1)),
+        ('xy_set', lambda: d.xy_set(3, 2, 1), None),
+        ('dot_set', lambda: d.dot_set(2, 1, 1), None),
+    ]
+
+def _ws2812_ops(d):
+    c = d.RED
+    return [
+        ('fill', lambda: d.fill(c, False), None),
+        ('fill_rect', lambda: d.fill_rect(1, 1, 4, 3, c, False), None),
+        ('hline', lambda: d.hline(0, 2, 8, c, False), None),
+        ('vline', lambda: d.vline(2, 0, 8, c, False), None),
+        ('line', lambda: d.line(0, 0, 7, 5, c, False), None),
+        ('pixel', lambda: d.pixel2d(5, 5, c), None),
+        ('show', lambda: d.show(), None),
+        ('xy_set', lambda: d.xy_set(3, 2, c), None),
+        ('dot_set', lambda: d.dot_set(2, 1, c), None),
+    ]
+
+def _neopixel_ops(d):
+    c = d.RED
+    return [
+        ('fill', lambda: d.fill(c), None),
+        ('fill_rect', lambda: d.fill_rect(1, 1, 4, 3, c, False), None),
+        ('hline', lambda: d.hline(0, 2, 8, c, False), None),
+        ('pixel', lambda: d.pixel2d(5, 5, c), None),
+        ('show', lambda: d.show(), None),
+        ('xy_set', lambda: d.xy_set(3, 2, c), None),
+        ('dot_set', lambda: d.dot_set(2, 1, c), None),
+    ]
+
+# driver name, DAL module, display configuration, primitive calls
+DRIVERS = (
+    ('st7789', 'dal_st7789', 'st7789.cfg', _st7789_ops),
+    ('st7735', 'dal_st7735', 'st7735.cfg', _st7735_ops),
+    ('sh1106', 'dal_sh1106', 'sh1106.cfg', _oled_ops),
+    ('ssd1306', 'dal_ssd1306', 'ssd1306.cfg', _oled_ops),
+    ('ws2812', 'dal_ws2812', 'ws2812_8x8.cfg', _ws2812_ops),
+    ('neopixel', 'dal_neopixel', 'neopixel_8x8.cfg', _neopixel_ops),
+)
+
+# Return the heap bytes allocated by a single call
+def _alloc(call):
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    if 'mem_alloc' in dir(gc):
+        gc.disable()
+        start = gc.mem_alloc()
+        call()
+        used = gc.mem_alloc() - start
+        gc.enable()
+        return max(0, used)
+    return 0
+
+# Measure a single primitive
+def measure(call, setup=None, min_time_ms=20):
+    # bus traffic of a single call
+    if setup:
+        setup()
+    LOG.clear()
+    call()
+    result = {
+        'transactions' : LOG.transactions,
+        'bytes' : LOG.bytes,
+        'toggles' : LOG.toggles}
+
+    # heap allocation and minimum wall time, do not record events
+    events = LOG.events_enabled
+    LOG.events_enabled = False
+    if setup:
+        setup()
+    result['alloc'] = _alloc(call)
+
+    best = None
+    total = 0
+    calls = 0
+    while (total < min_time_ms * 1000 or calls < 3) and calls < _MAX_CALLS:
+        if setup:
+            setup()
+        start = time.perf_counter_ns()
+        call()
+        elapsed = (time.perf_counter_ns() - start) / 1000
+        total += elapsed
+        calls += 1
+        if best is None or elapsed < best:
+            best = elapsed
+    LOG.events_enabled = events
+    LOG.clear()
+    result['time_us'] = round(best, 1)
+    return result
+
+# Run the benchmark for the selected drivers, return {driver : {primitive : metrics}}
+def run(drivers=None, min_time_ms=20):
+    results = {}
+    for name, module, display_cfg, ops in DRIVERS:
+        if drivers and name not in drivers:
+            continue
+        display = __import__(module).DAL(_config(display_cfg))
+        results[name] = {}
+        for op, call, setup in ops(display):
+            results[name][op] = measure(call, setup, min_time_ms)
+    return results
+
+# Compare results with the baseline, return a list of regression messages
+def compare(results, baseline, threshold=5, time_threshold=50):
+    regressions = []
+    for driver, ops in results.items():
+        if driver not in baseline:
+            continue
+        for op, metrics in ops.items():
+            if op not in baseline[driver]:
+                continue
+            base = baseline[driver][op]
+            for key, val in metrics.items():
+                if key not in base:
+                    continue
+                ref = base[key]
+                limit = time_threshold if key == 'time_us' else threshold
+                if key == 'time_us' and val - ref < _TIME_NOISE_US:
+                    continue
+                if val > ref * (1 + limit / 100) and val > ref:
+                    pct = (val - ref) * 100 / ref if ref else 100
+                    regressions.append(f'{driver}.{op} {key} {ref} -> {val} (+{pct:.0f}%)')
+    return regressions
+
+# Print the results as a table, include the change against the baseline
+def report(results, baseline):
+    print(f'{"primitive":24}{"time_us":>10}{"trans":>8}{"bytes":>9}{"toggles":>9}{"alloc":>9}')
+    for driver, ops in results.items():
+        for op, m in ops.items():
+            line = f'{driver + "." + op:24}{m["time_us"]:>10}{m["transactions"]:>8}' \
+                   f'{m["bytes"]:>9}{m["toggles"]:>9}{m["alloc"]:>9}'
+            base = baseline.get(driver, {}).get(op)
+            if base and base['time_us']:
+                line += f'  {(m["time_us"] - base["time_us"]) * 100 / base["time_us"]:+.0f}%'
+            print(line)
+
+def main(argv):
+    drivers = []
+    output = 'bench_output.json'
+    baseline_file = f'{_ROOT}/host/bench_baseline.json'
+    threshold = 5
+    time_threshold = 50
+    min_time_ms = 20
+    update = False
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--update':
+            update = True
+        elif arg in ('--driver', '--output', '--baseline', '--threshold', '--time-threshold', '--min-time') \
+                and i + 1 < len(argv):
+            i += 1
+            val = argv[i]
+            if arg == '--driver':
+                drivers.append(val)
+            elif arg == '--output':
+                output = val
+            elif arg == '--baseline':
+                baseline_file = val
+            elif arg == '--threshold':
+                threshold = float(val)
+            elif arg == '--time-threshold':
+                time_threshold = float(val)
+            else:
+                min_time_ms = float(val)
+        else:
+            print(f'unknown option {arg}')
+            return 2
+        i += 1
+
+    baseline = {}
+    try:
+        with open(baseline_file, 'r') as fd:
+            baseline = json.load(fd)
+    except OSError:
+        print(f'baseline {baseline_file} not found')
+
+    results = run(drivers, min_time_ms)
+    report(results, baseline)
+    with open(output, 'w') as fd:
+        json.dump(results, fd, indent=1)
+
+    if update:
+        # keep the baseline of drivers that were not run
+        baseline |= results
+        with open(baseline_file, 'w') as fd:
+            json.dump(baseline, fd, indent=1)
+        print(f'baseline {baseline_file} updated')
+        return 0
+
+    regressions = compare(results, baseline, threshold, time_threshold)
+    for msg in regressions:
+        print(f'REGRESSION {msg}')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
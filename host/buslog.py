@@ -0,0 +1,119 @@
+# transaction log shared by the host stand-in bus and pin objects
+#
+# Every bus write, bus read and output pin level change is counted.
+# If events is enabled, each transaction is also appended to the event
+# list as a compact tuple
+#   (timestamp_us, kind, source, value)
+#     kind   - WRITE, READ or PIN
+#     source - bus or pin name, e.g. 'spi0', 'i2c1', 'GP16'
+#     value  - byte count (WRITE, READ) or pin level (PIN)
+# If keep_data is enabled, the written bytes are appended to WRITE events.
+#
+#   from buslog import LOG
+#   LOG.clear()
+#   display.fill_rect(0, 0, 10, 10, RED)
+#   print(LOG.summary())
+
+import time
+
+# event kinds
+WRITE = 0
+READ = 1
+PIN = 2
+
+_KIND_NAMES = ('WRITE', 'READ', 'PIN')
+
+# microsecond timestamp on CPython and MicroPython
+if 'ticks_us' in dir(time):
+    _timestamp_us = time.ticks_us
+else:
+    def _timestamp_us():
+        return time.perf_counter_ns() // 1000
+
+class BusLog:
+    def __init__(self, events=True, keep_data=False):
+        self.events_enabled = events
+        self.keep_data = keep_data
+        self.clear()
+
+    # Reset the counters and the event list
+    def clear(self):
+        self.events = []
+        self.transactions = 0
+        self.bytes = 0
+        self.reads = 0
+        self.read_bytes = 0
+        self.toggles = 0
+        self.sources = {}
+
+    # Count the transaction per source
+    def _count(self, source, nbytes):
+        if source in self.sources:
+            cnt = self.sources[source]
+            cnt[0] += 1
+            cnt[1] += nbytes
+        else:
+            self.sources[source] = [1, nbytes]
+
+    # Record a bus write of the bytes in data
+    # extra - bytes sent in addition to data, e.g. the I2C address
+    def write(self, source, data, extra=0):
+        nbytes = len(data) + extra
+        self.transactions += 1
+        self.bytes += nbytes
+        self._count(source, nbytes)
+        if self.events_enabled:
+            if self.keep_data:
+                self.events.append((_timestamp_us(), WRITE, source, nbytes, bytes(data)))
+            else:
+                self.events.append((_timestamp_us(), WRITE, source, nbytes))
+
+    # Record a single bus write of all buffers in vector
+    def writev(self, source, vector, extra=0):
+        if self.keep_data:
+            self.write(source, b''.join(vector), extra)
+            return
+        nbytes = extra
+        for buf in vector:
+            nbytes += len(buf)
+        self.transactions += 1
+        self.bytes += nbytes
+        self._count(source, nbytes)
+        if self.events_enabled:
+            self.events.append((_timestamp_us(), WRITE, source, nbytes))
+
+    # Record a bus read of nbytes bytes
+    def read(self, source, nbytes):
+        self.reads += 1
+        self.read_bytes += nbytes
+        if self.events_enabled:
+            self.events.append((_timestamp_us(), READ, source, nbytes))
+
+    # Record an output pin level change
+    def pin(self, source, level):
+        self.toggles += 1
+        if self.events_enabled:
+            self.events.append((_timestamp_us(), PIN, source, level))
+
+    # Return the counters as a dictionary
+    def summary(self):
+        return {
+            'transactions' : self.transactions,
+            'bytes' : self.bytes,
+            'reads' : self.reads,
+            'read_bytes' : self.read_bytes,
+            'toggles' : self.toggles}
+
+    # Print the event list, at most limit events
+    def dump(self, limit=None):
+        events = self.events if limit is None else self.events[:limit]
+        t0 = events[0][0] if len(events) > 0 else 0
+        for event in events:
+            line = f'{event[0] - t0:10} {_KIND_NAMES[event[1]]:6} {event[2]:8} {event[3]}'
+            if len(event) > 4:
+                line += ' ' + event[4][:16].hex()
+            print(line)
+        print(self.summary())
+
+# default log used by all stand-in devices
+LOG = BusLog()
@@ -0,0 +1,243 @@
+# host stand-in for the MicroPython framebuf module
+#
+# Pure python implementation of FrameBuffer for all pixel formats. The
+# memory layout matches the MicroPython implementation, so buffers can be
+# sent to the display drivers unchanged. It is slow, use it to verify
+# drivers and to count bus traffic, not to measure drawing speed.
+#
+# Notes
+#   text() uses the 8x8 font from fonts/vga1_8x8.py if it can be imported,
+#   else each character is drawn as an empty rectangle.
+
+MONO_VLSB = 0
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+
+MVLSB = MONO_VLSB
+
+try:
+    import vga1_8x8 as _font
+except ImportError:
+    _font = None
+
+# bits per pixel for each format
+_BPP = {MONO_VLSB: 1, RGB565: 16, GS4_HMSB: 4, MONO_HLSB: 1, MONO_HMSB: 1, GS2_HMSB: 2, GS8: 8}
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        if format not in _BPP:
+            raise ValueError('invalid format')
+        self.buffer = buffer
+        self._buf = memoryview(buffer).cast('B')
+        self.width = width
+        self.height = height
+        self.format = format
+        self.stride = width if stride is None else stride
+        if format in (MONO_HLSB, MONO_HMSB):
+            self.stride = (self.stride + 7) & ~7
+
+    # Read a pixel from the buffer, no clipping
+    def _get(self, x, y):
+        buf = self._buf
+        fmt = self.format
+        if fmt == MONO_VLSB:
+            return (buf[(y >> 3) * self.stride + x] >> (y & 7)) & 1
+        if fmt == RGB565:
+            i = (x + y * self.stride) * 2
+            return buf[i] | (buf[i + 1] << 8)
+        if fmt == GS8:
+            return buf[x + y * self.stride]
+        if fmt == MONO_HLSB:
+            i = (x + y * self.stride) >> 3
+            return (buf[i] >> (7 - (x & 7))) & 1
+        if fmt == MONO_HMSB:
+            i = (x + y * self.stride) >> 3
+            return (buf[i] >> (x & 7)) & 1
+        if fmt == GS4_HMSB:
+            i = (x + y * self.stride) >> 1
+            return (buf[i] >> (0 if x & 1 else 4)) & 0x0F
+        # GS2_HMSB
+        i = (x + y * self.stride) >> 2
+        return (buf[i] >> ((x & 3) << 1)) & 0x03
+
+    # Write a pixel to the buffer, no clipping
+    def _set(self, x, y, c):
+        buf = self._buf
+        fmt = self.format
+        if fmt == MONO_VLSB:
+            i = (y >> 3) * self.stride + x
+            bit = 1 << (y & 7)
+            buf[i] = (buf[i] | bit) if c else (buf[i] & ~bit)
+        elif fmt == RGB565:
+            i = (x + y * self.stride) * 2
+            buf[i] = c & 0xFF
+            buf[i + 1] = (c >> 8) & 0xFF
+        elif fmt == GS8:
+            buf[x + y * self.stride] = c & 0xFF
+        elif fmt == MONO_HLSB:
+            i = (x + y * self.stride) >> 3
+            bit = 0x80 >> (x & 7)
+            buf[i] = (buf[i] | bit) if c else (buf[i] & ~bit)
+        elif fmt == MONO_HMSB:
+            i = (x + y * self.stride) >> 3
+            bit = 1 << (x & 7)
+            buf[i] = (buf[i] | bit) if c else (buf[i] & ~bit)
+        elif fmt == GS4_HMSB:
+            i = (x + y * self.stride) >> 1
+            if x & 1:
+                buf[i] = (buf[i] & 0xF0) | (c & 0x0F)
+            else:
+                buf[i] = (buf[i] & 0x0F) | ((c & 0x0F) << 4)
+        else:
+            i = (x + y * self.stride) >> 2
+            shift = (x & 3) << 1
+            buf[i] = (buf[i] & ~(0x03 << shift)) | ((c & 0x03) << shift)
+
+    def fill(self, c):
+        self.fill_rect(0, 0, self.width, self.height, c)
+
+    def pixel(self, x, y, c=None):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            if c is None:
+                return self._get(x, y)
+            self._set(x, y, c)
+        return None
+
+    def fill_rect(self, x, y, w, h, c):
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width)
+        y1 = min(y + h, self.height)
+        for yy in range(y0, y1):
+            for xx in range(x0, x1):
+                self._set(xx, yy, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+        else:
+            self.fill_rect(x, y, w, 1, c)
+            self.fill_rect(x, y + h - 1, w, 1, c)
+            self.fill_rect(x, y, 1, h, c)
+            self.fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x0, y0, x1, y1, c):
+        dx = abs(x1 - x0)
+        sx = 1 if x0 < x1 else -1
+        dy = -abs(y1 - y0)
+        sy = 1 if y0 < y1 else -1
+        error = dx + dy
+        while True:
+            self.pixel(x0, y0, c)
+            e2 = 2 * error
+            if e2 >= dy:
+                if x0 == x1:
+                    break
+                error += dy
+                x0 += sx
+            if e2 <= dx:
+                if y0 == y1:
+                    break
+                error += dx
+                y0 += sy
+
+    # Quadrant mask m: bit 0 = Q1 (x+, y-), 1 = Q2, 2 = Q3, 3 = Q4
+    def ellipse(self, x, y, xr, yr, c, f=False, m=0x0F):
+        for yy in range(-yr, yr + 1):
+            for xx in range(-xr, xr + 1):
+                if xr and yr and (xx * xx * yr * yr + yy * yy * xr * xr) > xr * xr * yr * yr:
+                    continue
+                if not f and xr and yr:
+                    # keep the outline only
+                    ox = abs(xx) + 1
+                    oy = abs(yy) + 1
+                    if (ox * ox * yr * yr + yy * yy * xr * xr) <= xr * xr * yr * yr and \
+                       (xx * xx * yr * yr + oy * oy * xr * xr) <= xr * xr * yr * yr:
+                        continue
+                quad = (0 if yy <= 0 else 3) if xx >= 0 else (1 if yy <= 0 else 2)
+                if m & (1 << quad):
+                    self.pixel(x + xx, y + yy, c)
+
+    def poly(self, x, y, coords, c, f=False):
+        n = len(coords) // 2
+        for i in range(n):
+            j = (i + 1) % n
+            self.line(x + coords[2 * i], y + coords[2 * i + 1],
+                      x + coords[2 * j], y + coords[2 * j + 1], c)
+        if f and n > 2:
+            ys = coords[1::2]
+            for yy in range(min(ys), max(ys) + 1):
+                nodes = []
+                for i in range(n):
+                    j = (i + 1) % n
+                    ya = coords[2 * i + 1]
+                    yb = coords[2 * j + 1]
+                    if (ya <= yy < yb) or (yb <= yy < ya):
+                        xa = coords[2 * i]
+                        xb = coords[2 * j]
+                        nodes.append(xa + (yy - ya) * (xb - xa) // (yb - ya))
+                nodes.sort()
+                for k in range(0, len(nodes) - 1, 2):
+                    self.hline(x + nodes[k], y + yy, nodes[k + 1] - nodes[k] + 1, c)
+
+    def text(self, s, x, y, c=1):
+        for ch in s:
+            code = ord(ch)
+            if _font is not None and _font.FIRST <= code < _font.LAST:
+                idx = (code - _font.FIRST) * 8
+                for row in range(8):
+                    bits = _font.FONT[idx + row]
+                    for col in range(8):
+                        if bits & (0x80 >> col):
+                            self.pixel(x + col, y + row, c)
+            else:
+                self.rect(x, y, 8, 8, c)
+            x += 8
+
+    def scroll(self, xstep, ystep):
+        if xstep < 0:
+            sx, xend, dx = 0, self.width + xstep, 1
+        else:
+            sx, xend, dx = self.width - 1, xstep - 1, -1
+        if ystep < 0:
+            y, yend, dy = 0, self.height + ystep, 1
+        else:
+            y, yend, dy = self.height - 1, ystep - 1, -1
+        while y != yend:
+            x = sx
+            while x != xend:
+                self._set(x, y, self._get(x - xstep, y - ystep))
+                x += dx
+            y += dy
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if isinstance(fbuf, tuple):
+            fbuf = FrameBuffer(*fbuf)
+        for yy in range(fbuf.height):
+            ty = y + yy
+            if not 0 <= ty < self.height:
+                continue
+            for xx in range(fbuf.width):
+                tx = x + xx
+                if not 0 <= tx < self.width:
+                    continue
+                col = fbuf._get(xx, yy)
+                if col == key:
+                    continue
+                if palette is not None:
+                    col = palette._get(col, 0)
+                self._set(tx, ty, col)
+
+# MicroPython 1.x compatibility
+def FrameBuffer1(buffer, width, height, stride=None):
+    return FrameBuffer(buffer, width, height, MONO_VLSB, stride)
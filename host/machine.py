@@ -0,0 +1,306 @@
+# host stand-in for the MicroPython machine module
+#
+# Provides the subset of the machine API used by the drivers in lib/ and
+# the application in src/. Bus writes and output pin level changes are
+# recorded in buslog.LOG. Nothing is sent to real hardware.
+#
+# Notes
+#   Pin.simulate(level) drives an input pin and triggers its irq handler.
+#   RTC.datetime() sets a class level offset to the host time, so
+#   time.time() is not modified.
+#   Timer callbacks run in a background thread.
+
+import sys
+import time
+import threading
+from buslog import LOG
+
+# pin name used in the log, e.g. 'GP16'
+def _pin_name(pin):
+    if isinstance(pin, Pin):
+        return pin.name
+    if pin is None or isinstance(pin, str):
+        return pin
+    return f'GP{pin}'
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+    DRIVE_0 = 0
+    DRIVE_1 = 1
+    DRIVE_2 = 2
+    DRIVE_3 = 3
+    # st7735 references Pin.drive as a value
+    drive = DRIVE_0
+
+    def __init__(self, id, mode=-1, pull=-1, value=None, drive=None, alt=None):
+        self.id = id
+        self.name = _pin_name(id)
+        self.mode = self.IN if mode == -1 else mode
+        self.pull = None if pull == -1 else pull
+        self._level = 1 if self.pull == self.PULL_UP else 0
+        self._handler = None
+        self._trigger = 0
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None, drive=None, alt=None):
+        if mode != -1:
+            self.mode = mode
+        if pull != -1:
+            self.pull = pull
+        if value is not None:
+            self.value(value)
+
+    # Get or set the pin level, level changes of output pins are logged
+    def value(self, val=None):
+        if val is None:
+            return self._level
+        level = 1 if val else 0
+        if level != self._level:
+            self._level = level
+            if self.mode != self.IN:
+                LOG.pin(self.name, level)
+
+    def __call__(self, val=None):
+        return self.value(val)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(1 - self._level)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+    # Drive an input pin from the host side, call the irq handler on a matching edge
+    def simulate(self, level):
+        level = 1 if level else 0
+        if level == self._level:
+            return
+        self._level = level
+        edge = self.IRQ_RISING if level else self.IRQ_FALLING
+        if self._handler and self._trigger & edge:
+            self._handler(self)
+
+    def __repr__(self):
+        return f'Pin({self.id})'
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id, baudrate=1_000_000, polarity=0, phase=0, bits=8, firstbit=MSB,
+                 sck=None, mosi=None, miso=None):
+        self.id = id
+        self.name = f'spi{id}'
+        self.baudrate = baudrate
+
+    def init(self, baudrate=1_000_000, **kwargs):
+        self.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def write(self, buf):
+        LOG.write(self.name, buf)
+
+    def read(self, nbytes, write=0x00):
+        LOG.read(self.name, nbytes)
+        return bytes(nbytes)
+
+    def readinto(self, buf, write=0x00):
+        LOG.read(self.name, len(buf))
+
+    def write_readinto(self, write_buf, read_buf):
+        LOG.write(self.name, write_buf)
+        LOG.read(self.name, len(read_buf))
+
+class I2C:
+    def __init__(self, id=-1, scl=None, sda=None, freq=400_000, timeout=50_000):
+        self.id = id
+        self.name = f'i2c{id}'
+        self.freq = freq
+        # addresses answering scan() and reads
+        self.devices = [0x3C]
+
+    def init(self, scl=None, sda=None, freq=400_000):
+        self.freq = freq
+
+    def scan(self):
+        return list(self.devices)
+
+    # The address byte is counted as part of the transaction
+    def writeto(self, addr, buf, stop=True):
+        LOG.write(self.name, buf, 1)
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        LOG.writev(self.name, vector, 1)
+        return sum(len(buf) for buf in vector)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        LOG.read(self.name, nbytes)
+        return bytes(nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        LOG.read(self.name, len(buf))
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        LOG.write(self.name, buf, 2)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        LOG.read(self.name, nbytes)
+        return bytes(nbytes)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        LOG.read(self.name, len(buf))
+
+class SoftI2C(I2C):
+    def __init__(self, scl=None, sda=None, freq=400_000, timeout=50_000):
+        super().__init__(-1, scl, sda, freq, timeout)
+        self.name = 'softi2c'
+
+class RTC:
+    # offset of the simulated RTC to the host clock (seconds)
+    _offset = 0
+
+    def __init__(self, id=0):
+        pass
+
+    # Get (year, month, day, weekday, hours, minutes, seconds, subseconds)
+    # or set the RTC from the same tuple (weekday is ignored)
+    def datetime(self, dt=None):
+        if dt is None:
+            secs = time.time() + RTC._offset
+            tm = time.gmtime(secs)
+            return (tm[0], tm[1], tm[2], tm[6], tm[3], tm[4], tm[5], int(secs % 1 * 1_000_000))
+        secs = _timegm((dt[0], dt[1], dt[2], dt[4], dt[5], dt[6]))
+        RTC._offset = secs - int(time.time())
+
+    def init(self, dt):
+        self.datetime(dt)
+
+# seconds since 1970 for a UTC (year, month, day, hours, minutes, seconds) tuple
+def _timegm(dt):
+    year, month, day, hours, minutes, seconds = dt
+    days = (year - 1970) * 365 + (year - 1969) // 4 - (year - 1901) // 100 + (year - 1601) // 400
+    mdays = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+    days += mdays[month - 1] + day - 1
+    if month > 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        days += 1
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.id = id
+        self._thread = None
+        self._stop = None
+        if callback is not None:
+            self.init(mode=mode, period=period, freq=freq, callback=callback)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.deinit()
+        if freq > 0:
+            period = 1000 / freq
+        interval = max(period, 1) / 1000
+        stop = threading.Event()
+        def run():
+            while not stop.wait(interval):
+                callback(self)
+                if mode == self.ONE_SHOT:
+                    break
+        self._stop = stop
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def deinit(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+            self._thread = None
+
+class ADC:
+    CORE_TEMP = 4
+    ATTN_0DB = 0
+    ATTN_11DB = 3
+
+    def __init__(self, pin, atten=None):
+        self.pin = pin
+        # ~27 degrees on the pico temperature sensor
+        self.level = 14_000
+
+    def read_u16(self):
+        return self.level
+
+    def read(self):
+        return self.level >> 4
+
+    def atten(self, atten):
+        pass
+
+# sleep and reset causes
+IDLE = 0
+SLEEP = 2
+DEEPSLEEP = 4
+PWRON_RESET = 1
+HARD_RESET = 2
+WDT_RESET = 3
+DEEPSLEEP_RESET = 4
+SOFT_RESET = 5
+
+_freq = 150_000_000
+
+def freq(hz=None):
+    global _freq
+    if hz is None:
+        return _freq
+    _freq = hz
+
+def unique_id():
+    return b'\xe6\x61\x41\x04\x03\x2b\x5a\x2c'
+
+def reset_cause():
+    return PWRON_RESET
+
+def reset():
+    sys.exit(0)
+
+def soft_reset():
+    sys.exit(0)
+
+def idle():
+    time.sleep(0.001)
+
+# Sleep the given time (ms) or until the next event if not specified
+def lightsleep(time_ms=None):
+    time.sleep((1 if time_ms is None else time_ms) / 1000)
+
+def deepsleep(time_ms=None):
+    sys.exit(0)
+
+def disable_irq():
+    return 0
+
+def enable_irq(state=0):
+    pass
@@ -0,0 +1,54 @@
+# host stand-in for the MicroPython micropython module
+#
+# The code emitter decorators return the function unchanged. On the
+# device, the decorators and the viper pointer types are builtins,
+# mphost.install() adds them to the CPython builtins.
+
+def const(expr):
+    return expr
+
+def native(func):
+    return func
+
+def viper(func):
+    return func
+
+def asm_thumb(func):
+    return func
+
+def opt_level(level=None):
+    return 0
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+def schedule(func, arg):
+    func(arg)
+
+def heap_lock():
+    return 0
+
+def heap_unlock():
+    return 0
+
+def kbd_intr(chr):
+    pass
+
+def mem_info(verbose=False):
+    print('mem: not available on the host')
+
+def qstr_info(verbose=False):
+    print('qstr: not available on the host')
+
+# viper types, ptr access uses the native (little endian) byte order like the device
+def uint(val):
+    return int(val) & 0xFFFFFFFF
+
+def ptr8(buf):
+    return memoryview(buf).cast('B')
+
+def ptr16(buf):
+    return memoryview(buf).cast('B').cast('H')
+
+def ptr32(buf):
+    return memoryview(buf).cast('B').cast('I')
@@ -0,0 +1,129 @@
+# host support to import and run the device code on CPython or the unix
+# MicroPython port
+#
+# install() adds the host stand-in modules (machine, rp2, network,
+# neopixel, framebuf, micropython, uctypes) and the lib, src and fonts
+# directories to the module search path. On CPython it also adds the
+# MicroPython specific time functions, the u-module aliases and the
+# builtins used by @micropython.viper code.
+#
+#   import mphost
+#   mphost.install()
+#   from buslog import LOG
+#   import dal_st7789
+#
+# Run a device script on the host (configuration files are read from the
+# current directory)
+#   python host/mphost.py src/bcd_clock.py
+#
+# Notes
+#   On the unix MicroPython port the builtin modules (time, micropython,
+#   framebuf, ...) take precedence, only the missing modules are used.
+
+import sys
+import time
+
+# repository root directory
+def _root():
+    path = __file__.replace('\\', '/')
+    path = path[:path.rfind('/')] if '/' in path else '.'
+    if path.endswith('/host'):
+        return path[:-5] or '/'
+    return path + '/..'
+
+# MicroPython tick counters wrap at 2**30
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+# MicroPython time functions based on the CPython performance counter
+def _ticks_ms():
+    return (time.perf_counter_ns() // 1_000_000) & _TICKS_MAX
+
+def _ticks_us():
+    return (time.perf_counter_ns() // 1_000) & _TICKS_MAX
+
+def _ticks_cpu():
+    return time.perf_counter_ns() & _TICKS_MAX
+
+def _ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+def _ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & _TICKS_MAX
+    return diff - _TICKS_PERIOD if diff >= _TICKS_HALF else diff
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+def _sleep_us(us):
+    time.sleep(us / 1_000_000)
+
+# u-module aliases used by the device code
+_ALIASES = {
+    'utime' : 'time',
+    'uselect' : 'select',
+    'ustruct' : 'struct',
+    'urandom' : 'random',
+    'uos' : 'os',
+    'ujson' : 'json',
+    'usocket' : 'socket',
+    'uasyncio' : 'asyncio',
+    'ubinascii' : 'binascii',
+}
+
+_installed = False
+
+# Prepare the interpreter to import the device code
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    root = _root()
+    for name in ('fonts', 'src', 'lib', 'host'):
+        path = f'{root}/{name}'
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    if sys.implementation.name == 'micropython':
+        return
+
+    for name, func in (('ticks_ms', _ticks_ms), ('ticks_us', _ticks_us),
+                       ('ticks_cpu', _ticks_cpu), ('ticks_add', _ticks_add),
+                       ('ticks_diff', _ticks_diff), ('sleep_ms', _sleep_ms),
+                       ('sleep_us', _sleep_us)):
+        if not hasattr(time, name):
+            setattr(time, name, func)
+
+    for alias, name in _ALIASES.items():
+        if alias not in sys.modules:
+            try:
+                sys.modules[alias] = __import__(name)
+            except ImportError:
+                pass
+
+    # builtins available to @micropython.viper and @micropython.native code
+    import builtins
+    import micropython
+    builtins.micropython = micropython
+    builtins.const = micropython.const
+    builtins.uint = micropython.uint
+    builtins.ptr8 = micropython.ptr8
+    builtins.ptr16 = micropython.ptr16
+    builtins.ptr32 = micropython.ptr32
+
+    # MicroPython extensions of sys
+    if not hasattr(sys, 'print_exception'):
+        import traceback
+        sys.print_exception = lambda e, file=None: traceback.print_exception(e, file=file)
+
+if __name__ == '__main__':
+    install()
+    if len(sys.argv) < 2:
+        print('usage: mphost.py script [args]')
+        sys.exit(1)
+    import runpy
+    sys.argv = sys.argv[1:]
+    runpy.run_path(sys.argv[0], run_name='__main__')
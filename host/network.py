@@ -0,0 +1,71 @@
+# host stand-in for the MicroPython network module
+#
+# WLAN connects immediately to any network. The host network stack is
+# used by socket and ntptime, no traffic is simulated here.
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_WRONG_PASSWORD = -3
+STAT_NO_AP_FOUND = -2
+STAT_CONNECT_FAIL = -1
+STAT_GOT_IP = 3
+
+_country = 'XX'
+_hostname = 'mphost'
+
+def country(code=None):
+    global _country
+    if code is None:
+        return _country
+    _country = code
+
+def hostname(name=None):
+    global _hostname
+    if name is None:
+        return _hostname
+    _hostname = name
+
+class WLAN:
+    def __init__(self, interface_id=STA_IF):
+        self.interface_id = interface_id
+        self._active = False
+        self._status = STAT_IDLE
+        self._ssid = None
+
+    def active(self, val=None):
+        if val is None:
+            return self._active
+        self._active = bool(val)
+        if not self._active:
+            self._status = STAT_IDLE
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        self._ssid = ssid
+        self._status = STAT_GOT_IP if self._active else STAT_CONNECT_FAIL
+
+    def disconnect(self):
+        self._status = STAT_IDLE
+
+    def isconnected(self):
+        return self._status == STAT_GOT_IP
+
+    def status(self, param=None):
+        if param == 'rssi':
+            return -50
+        return self._status
+
+    def ifconfig(self, config=None):
+        return ('127.0.0.1', '255.0.0.0', '127.0.0.1', '127.0.0.1')
+
+    def config(self, *args, **kwargs):
+        if args == ('mac',):
+            return b'\x28\xcd\xc1\x00\x00\x01'
+        if args == ('ssid',):
+            return self._ssid
+        return None
+
+    def scan(self):
+        return []
@@ -0,0 +1,165 @@
+# convert images to the run length encoded format of lib/rleimage.py
+#
+# Images with at most 256 colors are stored with a palette (1 byte per
+# pixel value) if the result is smaller, other images as RGB565 (2 bytes
+# per pixel value).
+#
+#   python host/rleconv.py splash.ppm splash.rle
+#   python host/rleconv.py clock_face.py clock_face.rle --index 1
+#
+# Input formats
+#   .ppm    binary portable pixmap (P6, maxval 255), most image tools can
+#           export it, e.g. convert splash.png splash.ppm
+#   .py     bitmap module of ST7789.bitmap() (WIDTH, HEIGHT, BPP, PALETTE,
+#           BITMAP)
+#
+# Options
+#   --rgb565        always store RGB565 pixel values
+#   --index n       image index of a bitmap module, 0 if not defined
+#
+# Notes
+#   Runs of 3 or more equal pixels are stored as run records (up to 129
+#   pixels), other pixels as literal records (up to 128 pixels).
+#   encode() can be imported, e.g. to create test images.
+
+import sys
+import struct
+
+# Return a 565 encoded color
+def color565(red, green, blue):
+    return ((red & 0xF8) << 8) | ((green & 0xFC) << 3) | (blue >> 3)
+
+# Return width, height and the 565 encoded pixels of a binary PPM file
+def read_ppm(name):
+    with open(name, 'rb') as fd:
+        data = fd.read()
+    fields = []
+    pos = 0
+    while len(fields) < 4:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b'#':
+            pos = data.index(b'\n', pos)
+            continue
+        end = pos
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    if fields[0] != b'P6' or int(fields[3]) != 255:
+        raise ValueError(f'{name}: only binary PPM files with maxval 255 are supported')
+    width = int(fields[1])
+    height = int(fields[2])
+    pos += 1
+    pixels = [color565(data[i], data[i + 1], data[i + 2])
+              for i in range(pos, pos + width * height * 3, 3)]
+    return width, height, pixels
+
+# Return width, height and the 565 encoded pixels of a bitmap module
+def read_bitmap(name, index=0):
+    bitmap = {}
+    with open(name, 'r') as fd:
+        exec(fd.read(), bitmap)
+    width = bitmap['WIDTH']
+    height = bitmap['HEIGHT']
+    bpp = bitmap['BPP']
+    palette = bitmap['PALETTE']
+    data = bitmap['BITMAP']
+    bs_bit = bpp * width * height * index
+    pixels = []
+    for _ in range(width * height):
+        color_index = 0
+        for _ in range(bpp):
+            color_index = (color_index << 1) | ((data[bs_bit >> 3] >> (7 - (bs_bit & 7))) & 1)
+            bs_bit += 1
+        pixels.append(palette[color_index])
+    return width, height, pixels
+
+# Return the RLE image of the 565 encoded pixels
+def encode(width, height, pixels, rgb565=False):
+    palette = []
+    if not rgb565:
+        palette = sorted(set(pixels))
+        if len(palette) > 256:
+            palette = []
+    if palette:
+        index = {color: i for i, color in enumerate(palette)}
+        values = [index[color] for color in pixels]
+        pack = lambda value: bytes([value])
+    else:
+        values = pixels
+        pack = lambda value: struct.pack('>H', value)
+
+    out = bytearray(b'RI\x01')
+    out.append(8 if palette else 16)
+    out += struct.pack('>HHH', width, height, len(palette))
+    for color in palette:
+        out += struct.pack('>H', color)
+
+    literal = []
+    def flush():
+        if literal:
+            out.append(len(literal) - 1)
+            for value in literal:
+                out.extend(pack(value))
+            del literal[:]
+
+    count = len(values)
+    i = 0
+    while i < count:
+        j = i + 1
+        while j < count and j - i < 129 and values[j] == values[i]:
+            j += 1
+        if j - i >= 3:
+            flush()
+            out.append(j - i + 126)
+            out.extend(pack(values[i]))
+            i = j
+        else:
+            literal.append(values[i])
+            if len(literal) == 128:
+                flush()
+            i += 1
+    flush()
+    return bytes(out)
+
+def main(argv):
+    names = []
+    rgb565 = False
+    index = 0
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--rgb565':
+            rgb565 = True
+        elif arg == '--index' and i + 1 < len(argv):
+            i += 1
+            index = int(argv[i])
+        elif arg.startswith('--'):
+            print(f'unknown option {arg}')
+            return 2
+        else:
+            names.append(arg)
+        i += 1
+    if len(names) != 2:
+        print('usage: rleconv.py input.ppm|input.py output.rle [--rgb565] [--index n]')
+        return 2
+
+    source, target = names
+    if source.endswith('.py'):
+        width, height, pixels = read_bitmap(source, index)
+    else:
+        width, height, pixels = read_ppm(source)
+    data = encode(width, height, pixels, True)
+    if not rgb565:
+        paletted = encode(width, height, pixels)
+        if len(paletted) < len(data):
+            data = paletted
+    with open(target, 'wb') as fd:
+        fd.write(data)
+    print(f'{target}: {width}x{height} {data[3]} bpp, {len(data)} bytes '
+          f'({len(data) * 100 // (width * height * 2)}% of RGB565)')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
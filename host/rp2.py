@@ -0,0 +1,73 @@
+# host stand-in for the MicroPython rp2 module
+#
+# asm_pio() does not assemble the PIO program, the decorated function is
+# returned unchanged. Words written to a StateMachine are recorded in
+# buslog.LOG as a write of 4 bytes per word.
+
+from buslog import LOG
+
+class PIO:
+    OUT_LOW = 0
+    OUT_HIGH = 1
+    IN_LOW = 0
+    IN_HIGH = 1
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+    JOIN_NONE = 0
+    JOIN_TX = 1
+    JOIN_RX = 2
+    IRQ_SM0 = 0x100
+    IRQ_SM1 = 0x200
+    IRQ_SM2 = 0x400
+    IRQ_SM3 = 0x800
+
+    def __init__(self, id):
+        self.id = id
+
+    def state_machine(self, id, program=None, **kwargs):
+        return StateMachine(self.id * 4 + id, program, **kwargs)
+
+def asm_pio(**kwargs):
+    def decorator(func):
+        return func
+    return decorator
+
+class StateMachine:
+    def __init__(self, id, program=None, freq=-1, **kwargs):
+        self.id = id
+        self.name = f'sm{id}'
+        self.freq = freq
+        self._active = 0
+
+    def init(self, program=None, freq=-1, **kwargs):
+        self.freq = freq
+
+    def active(self, val=None):
+        if val is None:
+            return self._active
+        self._active = 1 if val else 0
+
+    # Each word is sent as 32 bits, shift is applied by the program
+    def put(self, value, shift=0):
+        if isinstance(value, int):
+            LOG.write(self.name, bytes(4))
+        else:
+            LOG.write(self.name, bytes(4 * len(value)))
+
+    def get(self, buf=None, shift=0):
+        return 0
+
+    def exec(self, instr):
+        pass
+
+    def tx_fifo(self):
+        return 0
+
+    def rx_fifo(self):
+        return 0
+
+    def irq(self, handler=None, trigger=0, hard=False):
+        pass
+
+    def restart(self):
+        pass
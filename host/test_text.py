@@ -0,0 +1,108 @@
+# host test of the cached text paths of the ST7789 driver
+#
+# Text is drawn with the glyph cache disabled and with glyph caches smaller
+# than the text line buffer. The bus writes are decoded into the pixels of
+# the frame memory (CASET, RASET, RAMWR), the pixels must be equal. Glyphs
+# evicted while a text run is pending must not change the output.
+#
+#   python host/test_text.py
+#
+# Notes
+#   The run fails (exit code 1) if the output of a cached driver differs.
+
+import sys
+import json
+import mphost
+
+mphost.install()
+
+from buslog import LOG, WRITE, PIN
+
+_ROOT = mphost._root()
+
+# commands decoded from the bus writes
+_CASET = 0x2A
+_RASET = 0x2B
+_RAMWR = 0x2C
+
+# text written with each font, more distinct characters than the small
+# glyph caches hold
+_TEXT = 'ABCDEFGH 12:34:56 abcdefgh ABCDEFGH'
+
+# (glyph_cache, text_buffer) of the cached drivers
+_CACHES = ((2048, 8192), (1024, 8192), (512, 2048), (8192, 8192))
+
+# Return a DAL with the given glyph cache and text buffer sizes
+def _display(glyph_cache, text_buffer):
+    import dal_st7789
+    cfg = {}
+    for name in ('hw_pico.cfg', 'st7789.cfg'):
+        with open(f'{_ROOT}/src/{name}', 'r') as fd:
+            cfg |= json.load(fd)
+    cfg['st7789_glyph_cache'] = glyph_cache
+    cfg['st7789_text_buffer'] = text_buffer
+    return dal_st7789.DAL(cfg)
+
+# Return the frame memory pixels {(column, row): color} written by
+# draw(display)
+def _output(display, draw):
+    LOG.events_enabled = True
+    LOG.keep_data = True
+    LOG.clear()
+    draw(display)
+    LOG.keep_data = False
+
+    dc_name = display.dc.name
+    dc = 1
+    command = None
+    columns = rows = (0, 0)
+    col = row = 0
+    pending = b''
+    pixels = {}
+    for event in LOG.events:
+        if event[1] == PIN and event[2] == dc_name:
+            dc = event[3]
+        elif event[1] == WRITE and len(event) > 4:
+            data = event[4]
+            if not dc:
+                command = data[0]
+                if command == _RAMWR:
+                    col, row = columns[0], rows[0]
+                    pending = b''
+            elif command == _CASET:
+                columns = (data[0] << 8 | data[1], data[2] << 8 | data[3])
+            elif command == _RASET:
+                rows = (data[0] << 8 | data[1], data[2] << 8 | data[3])
+            elif command == _RAMWR:
+                data = pending + data
+                for i in range(0, len(data) - 1, 2):
+                    pixels[(col, row)] = data[i] << 8 | data[i + 1]
+                    col += 1
+                    if col > columns[1]:
+                        col = columns[0]
+                        row += 1
+                pending = data[len(data) & ~1:]
+    return pixels
+
+def main():
+    import vga1_8x8
+    import vga1_16x16
+    import vga2_16x32
+
+    def draw(display):
+        for font, y in ((vga1_8x8, 0), (vga1_16x16, 40), (vga2_16x32, 120)):
+            display.text(font, _TEXT, 0, y, display.RED, display.BLUE)
+            display.text(font, _TEXT, 0, y, display.GREEN, display.BLACK)
+
+    expected = _output(_display(0, 8192), draw)
+    failed = 0
+    for glyph_cache, text_buffer in _CACHES:
+        result = _output(_display(glyph_cache, text_buffer), draw)
+        ok = result == expected
+        print(f'glyph_cache {glyph_cache:5d} text_buffer {text_buffer:5d}  {"ok" if ok else "FAILED"}')
+        if not ok:
+            failed += 1
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
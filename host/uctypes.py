@@ -0,0 +1,20 @@
+# host stand-in for the MicroPython uctypes module
+#
+# Only the constants and addressof() are defined, structures (struct,
+# sizeof) are not supported and fail with AttributeError.
+
+LITTLE_ENDIAN = 0
+BIG_ENDIAN = 1
+NATIVE = 2
+
+UINT8 = 0
+INT8 = 1
+UINT16 = 2
+INT16 = 3
+UINT32 = 4
+INT32 = 5
+UINT64 = 6
+INT64 = 7
+
+def addressof(obj):
+    return id(obj)
@@ -0,0 +1,88 @@
+# platform independent BCD renderer using precomputed digit masks
+#
+# A field displays a 2 digit decimal value (0..99) in two columns of the
+# 8 x 4 virtual pixel grid. The tens digit is displayed in the field column,
+# the ones digit in the next column. The most significant bit is displayed
+# in row 0, the least significant bit in row 3.
+#
+# Each field value is converted to an 8 bit mask using a precomputed table
+#   bits 0..3 - ones digit, rows 0..3
+#   bits 4..7 - tens digit, rows 0..3
+# Only the virtual pixels that differ between the old and new mask are
+# written to the display.
+#
+#   renderer = BCDRenderer(display, bcolor)
+#   hours = renderer.add_field(0, hcolor)
+#   renderer.update(hours, 23)
+
+# Convert a 2 digit decimal value to a BCD cell mask
+def bcd_mask(val):
+    tens = val // 10
+    ones = val % 10
+    mask = 0
+    for row in range(4):
+        weight = 8 >> row
+        if ones & weight:
+            mask |= 1 << row
+        if tens & weight:
+            mask |= 1 << (4 + row)
+    return mask
+
+# Cell masks for all 2 digit values
+MASKS = bytes([bcd_mask(val) for val in range(100)])
+
+class BCDRenderer:
+    # target must implement xy_set(x, y, color)
+    def __init__(self, target, bcolor):
+        self.target = target
+        self.bcolor = bcolor
+        self._column = []
+        self._color = []
+        self._mask = []
+        self._value = []
+
+    # Add a field displayed at column x, x+1, return the field index
+    def add_field(self, x, color):
+        self._column.append(x)
+        self._color.append(color)
+        self._mask.append(0)
+        self._value.append(-1)
+        return len(self._column) - 1
+
+    # Return the currently displayed value of the field, -1 if not defined
+    def value(self, field):
+        return self._value[field]
+
+    # Forget the displayed state, call after the display has been cleared
+    # to the background color
+    def reset(self):
+        for field in range(len(self._mask)):
+            self._mask[field] = 0
+            self._value[field] = -1
+
+    # Display value in field, return the number of virtual pixels written
+    def update(self, field, val):
+        if val == self._value[field]:
+            return 0
+        self._value[field] = val
+        mask = MASKS[val]
+        diff = mask ^ self._mask[field]
+        self._mask[field] = mask
+        if diff == 0:
+            return 0
+
+        x = self._column[field]
+        color = self._color[field]
+        bcolor = self.bcolor
+        xy_set = self.target.xy_set
+        cnt = 0
+        bit = 0
+        while diff:
+            if diff & 1:
+                # tens digit in column x, ones digit in column x + 1
+                posx = x if bit > 3 else x + 1
+                xy_set(posx, bit & 3, color if mask & (1 << bit) else bcolor)
+                cnt += 1
+            diff >>= 1
+            bit += 1
+        return cnt
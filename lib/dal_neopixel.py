@@ -160,12 +160,12 @@ class DAL(NeoPixel):
         if show:
             self.show()
         
-    # set single virtual 'pixel' at x, y to color
+    # set single virtual 'pixel' at x, y to color, visible after show()
     def xy_set(self, x, y, color):
         if self.pixel_x == 2:
             posx = self.start_x + (x * self.pixel_x)
             posy = self.start_y + (y * self.pixel_y)
-            self.fill_rect(posx, posy, self.pixel_x, self.pixel_y, color)
+            self.fill_rect(posx, posy, self.pixel_x, self.pixel_y, color, False)
         else:
             self.pixel2d(self.start_x + x, self.start_y + y, color)
 
@@ -7,6 +7,10 @@
 #   st7735_rotate     - 0 if not defined, [0..3]
 #   st7735_color_rgb  - True if not defined, else RGB|BGR
 #   st7735_init       - initr if not defined ["initr", "initb", "initb2", "initg"]
+#   st7735_fill_chunk - pixels per fill transfer, 512 if not defined
+#   st7735_fill_cache - byte budget of the fill chunk cache, 4096 if not defined,
+#                       holds fill_cache // (2 * fill_chunk) colors but at least
+#                       one chunk, e.g. a fill_chunk of 2048 keeps one color
 #   spi_port          * SPI port 0..1
 #   spi_sda           * SPI mosi pin
 #   spi_scl           * SPI clock pin
@@ -93,6 +97,14 @@ class DAL(ST7735):
             if temp in inits.keys():
                 kinit = temp
 
+        # Fill chunk size and cache
+        fill_chunk = 512
+        if 'st7735_fill_chunk' in keys:
+            fill_chunk = cfg['st7735_fill_chunk']
+        fill_cache = 4096
+        if 'st7735_fill_cache' in keys:
+            fill_cache = cfg['st7735_fill_cache']
+
         if self.debug:
             print(f'DAL ST7735 implementation')
 
@@ -102,7 +114,7 @@ class DAL(ST7735):
             print(f'  Interface {spi}')
             
         # Display initialization
-        super().__init__(spi, pdc, pres, pcs)
+        super().__init__(spi, pdc, pres, pcs, fill_chunk=fill_chunk, fill_cache=fill_cache)
         self.rgb(color_rgb)
         if self.debug:
             yn = '' if color_rgb else 'in'
@@ -160,7 +172,7 @@ class DAL(ST7735):
     def xy_set(self, x, y, color):
         posx = self.start_x + x * (self.pixel_x + self.border)
         posy = self.start_y + y * (self.pixel_y + self.border)
-        super().fill_rect((posx, posy), (self.pixel_x, self.pixel_y), color)
+        self.fill_rect_xywh(posx, posy, self.pixel_x, self.pixel_y, color)
 
     # set single virtual 'dot' at x, y to color
     def dot_set(self, x, y, color):
@@ -168,7 +180,7 @@ class DAL(ST7735):
         dot_ofs = dot_size // 2
         posx = self.start_x + dot_ofs + x * (self.pixel_x + self.border)
         posy = self.start_y + dot_ofs + y * (self.pixel_y + self.border)
-        super().fill_rect((posx, posy), (dot_size, dot_size), color)
+        self.fill_rect_xywh(posx, posy, dot_size, dot_size, color)
 
     # graphics are immediately visible
     def show(self):
@@ -176,8 +188,8 @@ class DAL(ST7735):
     
     # convert low level API
     def hline(self, x, y, length, color):
-        super().hline((x, y), length, color)
+        self.hline_xyl(x, y, length, color)
 
     # convert low level API
     def vline(self, x, y, length, color):
-        super().vline((x, y), length, color)
+        self.vline_xyl(x, y, length, color)
@@ -15,9 +15,17 @@
 #   spi_dc              * SPI miso pin
 #   spi_res             * SPI reset pin
 #   spi_baud            - 40_000_000 if not defined
+#   st7789_fill_cache   - byte budget of the fill color cache, 2048 if not defined
+#   st7789_glyph_cache  - byte budget of the text glyph cache, 8192 if not defined
+#   st7789_text_buffer  - size of the text line buffer, 8192 if not defined
 #
 # Notes
 #   Limited choice in display sizes; 240x320, 240x240, 135x240, 128x128
+#   The fill color cache holds 512 bytes per color, 0 disables the cache
+#   The glyph cache holds width * height * 2 bytes per character, e.g. 1024
+#   bytes for a 16x32 font, 0 disables the cache
+#   The text line buffer is allocated when text is first drawn, 0 sends
+#   each character with a separate window write
 
 from machine import SPI, Pin
 from st7789 import ST7789
@@ -72,12 +80,23 @@ class DAL(ST7789):
         invert = False
         if 'st7789_color_invert' in keys:
             invert = cfg['st7789_color_invert']
+        fill_cache = 2048
+        if 'st7789_fill_cache' in keys:
+            fill_cache = cfg['st7789_fill_cache']
+        glyph_cache = 8192
+        if 'st7789_glyph_cache' in keys:
+            glyph_cache = cfg['st7789_glyph_cache']
+        text_buffer = 8192
+        if 'st7789_text_buffer' in keys:
+            text_buffer = cfg['st7789_text_buffer']
 
         # Normal initialization
         spi=SPI(port, baudrate=baud, sck=psck, mosi=psda, miso=pdc)
         super().__init__(spi, width, height,
                          dc=Pin(pdc,Pin.OUT), reset=Pin(pres,Pin.OUT), cs=Pin(pcs,Pin.OUT),
-                         rotation=rotate, color_order=color)
+                         rotation=rotate, color_order=color,
+                         fill_cache=fill_cache, glyph_cache=glyph_cache,
+                         text_buffer=text_buffer)
         self.rotate = rotate
         self.inversion_mode(invert)
         self.clear()
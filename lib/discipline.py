@@ -0,0 +1,167 @@
+# platform independent RTC drift discipline
+#
+# The RTC offset (NTP time - RTC time, ms) is measured at each NTP reply.
+# The discipline learns the RTC drift (ppm) from consecutive offsets and
+# predicts the offset between the replies. The predicted offset is not
+# applied to the RTC, it is added to the frame lead of the scheduler, so
+# the displayed second turns over at the NTP second boundary. The lead
+# changes by at most max_slew ms per frame (no visible jumps). The sync
+# interval is doubled while the drift estimate is stable.
+#
+#   disc = RTCDiscipline(phase_ms=30)
+#   if disc.due(now):
+#       send the NTP request
+#   on reply: if disc.update(offset, received, rtt): step the RTC, sched.sync()
+#   on failure: disc.failed(now)
+#   per frame: sched.phase_ms = disc.phase(now)
+#
+# Configuration
+#   phase_ms      - frame lead without correction (ms), 0 if not defined
+#   min_interval  - sync interval (s) if the drift is unknown or changed, 3600 if not defined
+#   max_interval  - maximum sync interval (s), 86400 if not defined
+#   max_slew      - maximum lead change per frame (ms), 20 if not defined
+#   gain          - weight of a new drift sample, 0.5 if not defined
+#   stable_ppm    - a drift sample within this value of the estimate is stable, 2 if not defined
+#   max_rtt       - replies with a larger round trip time (ms) are ignored, 250 if not defined
+#
+# Notes
+#   The RTC is only stepped (to the nearest NTP second) if the offset can
+#   not be compensated by the frame lead until the next sync, e.g. after
+#   the first sync, a long network outage or once the drift has used up
+#   the lead range. No drift sample is taken across a step.
+#   The sync interval is also limited so that the predicted offset stays
+#   within the lead range of the scheduler (+/-900 ms).
+#   The drift is stored in 0.01 ppm units, the per frame prediction uses
+#   small ints only and does not allocate. The maximum sync interval must
+#   be less than half the tick period (~6 days on MicroPython).
+
+import genlib as gl
+
+# lead range of the scheduler (ms)
+_RANGE_MS = 900
+
+# offset reserve kept within the lead range (ms)
+_MARGIN_MS = 100
+
+# drift samples outside this range (ppm) are ignored
+_MAX_PPM = 100
+
+# minimum time between offsets used for a drift sample (ms)
+_MIN_ELAPSED_MS = 600_000
+
+# delay (s) of the next sync after a failed request
+_RETRY_S = 300
+
+# delay (s) of the next sync after an RTC step
+_RECHECK_S = 60
+
+class RTCDiscipline:
+    def __init__(self, phase_ms=0, min_interval=3600, max_interval=86400, max_slew=20,
+                 gain=0.5, stable_ppm=2, max_rtt=250):
+        self.base = phase_ms
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_slew = max_slew
+        self.gain = gain
+        self.stable_ppm = stable_ppm
+        self.max_rtt = max_rtt
+        # drift estimate (ppm) and its value in 0.01 ppm units
+        self.ppm = 0.0
+        self._cppm = 0
+        # last measured offset (ms) and current sync interval (s)
+        self.offset = 0
+        self.interval = min_interval
+        # statistics
+        self.samples = 0
+        self.drift_samples = 0
+        self.rejected = 0
+        self.failures = 0
+        self.steps = 0
+        # tick value and offset of the reference measurement
+        self._ref_tick = None
+        self._ref_offset = 0
+        # tick value of the next sync, None if due
+        self._next = None
+        # lead currently applied (ms)
+        self._phase = phase_ms
+
+    # Return True if the next NTP request is due
+    def due(self, now):
+        return self._next is None or gl.local_ticks_diff(now, self._next) >= 0
+
+    # Return the offset (ms) predicted for tick value now
+    def correction(self, now):
+        if self._ref_tick is None:
+            return 0
+        secs = gl.local_ticks_diff(now, self._ref_tick) // 1000
+        return self._ref_offset + secs * self._cppm // 100_000
+
+    # Return the frame lead (ms) for tick value now, slewed towards the
+    # base lead plus the predicted offset
+    def phase(self, now):
+        target = self.base + self.correction(now)
+        step = max(-self.max_slew, min(self.max_slew, target - self._phase))
+        self._phase += step
+        return self._phase
+
+    # Record the offset (ms) measured at tick value tick
+    # Return True if the RTC must be stepped to the nearest NTP second
+    def update(self, offset, tick, rtt=0):
+        if rtt > self.max_rtt:
+            self.rejected += 1
+            self._schedule(tick, _RETRY_S)
+            return False
+        self.samples += 1
+        self.offset = offset
+
+        # Offset (or the offset predicted after the minimum interval) out of
+        # the lead range, step the RTC and measure again
+        drift = abs(self._cppm) * self.min_interval // 100_000
+        if abs(self.base + offset) + drift > _RANGE_MS - _MARGIN_MS:
+            self.steps += 1
+            self._ref_tick = None
+            self._phase = self.base
+            self._schedule(tick, _RECHECK_S)
+            return True
+
+        # Drift sample since the reference measurement
+        sampled = False
+        stable = False
+        if self._ref_tick is not None:
+            elapsed = gl.local_ticks_diff(tick, self._ref_tick)
+            if elapsed >= _MIN_ELAPSED_MS:
+                sample = (offset - self._ref_offset) * 1_000_000 / elapsed
+                sampled = True
+                if abs(sample) > _MAX_PPM:
+                    self.rejected += 1
+                elif self.drift_samples == 0:
+                    self.ppm = sample
+                    self.drift_samples = 1
+                else:
+                    stable = abs(sample - self.ppm) <= self.stable_ppm
+                    self.ppm += self.gain * (sample - self.ppm)
+                    self.drift_samples += 1
+                self._cppm = int(round(self.ppm * 100))
+        self._ref_tick = tick
+        self._ref_offset = offset
+
+        # Stretch the interval while the drift is stable, keep the
+        # predicted offset within the lead range
+        if stable:
+            self.interval = min(self.interval * 2, self.max_interval)
+        elif sampled:
+            self.interval = self.min_interval
+        if self._cppm != 0:
+            budget = _RANGE_MS - _MARGIN_MS - abs(self.base + offset)
+            self.interval = max(_RECHECK_S, min(self.interval, budget * 100_000 // abs(self._cppm)))
+        self._schedule(tick, self.interval)
+        return False
+
+    # Record a failed request at tick value now
+    def failed(self, now):
+        self.failures += 1
+        self._schedule(now, _RETRY_S)
+
+    # Schedule the next sync secs seconds after tick value tick
+    def _schedule(self, tick, secs):
+        self._next = gl.local_ticks_add(tick, secs * 1000)
@@ -433,27 +433,32 @@ def debug_timestamp():
 
 # Only works if time.time() returns UTC
 # DST determination for germany
-def is_dst():
-    utc = time.time()
+# utc - optional UTC epoch seconds, else current time
+def is_dst(utc=None):
+    if utc is None:
+        utc = time.time()
     return any(lwr <= utc < upr for (lwr, upr) in dst_ranges)
 
 # Return the local time as a tuple
 # TZ and DST compensation for germany
-def localtime(tz=None, dst=None):
+# secs - optional UTC epoch seconds, else current time
+def localtime(tz=None, dst=None, secs=None):
     if platform == 'linux':
-        lt = time.localtime()
+        lt = time.localtime(secs)
         return (lt[0], lt[1], lt[2], lt[3], lt[4], lt[5], lt[6], lt[7])
     else:
+        if secs is None:
+            secs = time.time()
         tz = 1
         if tz is not None:
             tz = tz
         dst = 0
         if dst is not None:
             dst = dst
-        elif is_dst():
+        elif is_dst(secs):
             dst = 1
         local_offset = (tz + dst) * 3600
-        return time.localtime(time.time()+local_offset)
+        return time.localtime(secs+local_offset)
 
 # Convert date/time tuple to european string time representation
 # if dow = True, tuple contains dow in [3]
@@ -601,6 +606,13 @@ def local_ticks_ms():
     else:
         return time.ticks_ms()
 
+# platform independent microsecond timer
+def local_ticks_us():
+    if platform == 'linux':
+        return time.time_ns() // 1000
+    else:
+        return time.ticks_us()
+
 # platform independent callback handler
 def print_exception(e):
     if module_available('traceback'):
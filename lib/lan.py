@@ -23,6 +23,142 @@ import uselect
 import ustruct
 import genlib as gl
 
+# (date(2000, 1, 1) - date(1900, 1, 1)).days * 24*60*60
+_NTP_DELTA_2000 = 3155673600
+# (date(1970, 1, 1) - date(1900, 1, 1)).days * 24*60*60
+_NTP_DELTA_1970 = 2208988800
+
+# Non-blocking NTP request
+#   start() sends the request, poll() waits at most timeout_ms for the
+#   reply and returns None while the reply is pending, True if a valid reply
+#   was received, False if the request failed or timed out.
+#
+#   req = NTPRequest('pool.ntp.org')
+#   req.start()
+#   while req.poll() is None:
+#       do_something_else()
+#   if req.state == NTPRequest.DONE:
+#       print(req.utc, req.ms, req.rtt, req.received)
+#
+# Notes
+#   The host name lookup in start() may block. The address is cached by
+#   the request object, reuse the object to avoid repeated lookups.
+#   A reply is only accepted if it echoes the transmit timestamp of the
+#   request and the server is synchronized.
+class NTPRequest:
+    IDLE = 0
+    PENDING = 1
+    DONE = 2
+    FAILED = 3
+
+    def __init__(self, host='pool.ntp.org', timeout=10):
+        self.host = host
+        self.timeout = timeout
+        self.state = self.IDLE
+        self.error = None
+        # UTC epoch seconds and ms of the reply (corrected by rtt / 2)
+        self.utc = 0
+        self.ms = 0
+        # round trip time (ms)
+        self.rtt = 0
+        # tick value (ms) at which the reply was received
+        self.received = 0
+        self._addr = None
+        self._sock = None
+        self._poller = None
+        self._query = bytearray(48)
+        self._sent = 0
+
+    # Send the request, return False if it could not be sent
+    def start(self):
+        self.close()
+        self.error = None
+        query = self._query
+        query[0] = 0x1B
+        # random transmit timestamp, echoed as originate timestamp by the server
+        for i in range(40, 48):
+            query[i] = urandom.getrandbits(8)
+        try:
+            if self._addr is None:
+                self._addr = socket.getaddrinfo(self.host, 123)[0][-1]
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.setblocking(False)
+            self._poller = uselect.poll()
+            self._poller.register(self._sock, uselect.POLLIN)
+            self._sent = gl.local_ticks_ms()
+            self._sock.sendto(query, self._addr)
+        except Exception as e:
+            self._fail(f'send failed ({e})')
+            return False
+        self.state = self.PENDING
+        return True
+
+    # Wait at most timeout_ms for the reply
+    # Return None while pending, True if a valid reply was received, else False
+    def poll(self, timeout_ms=0):
+        if self.state != self.PENDING:
+            return self.state == self.DONE
+        try:
+            ready = self._poller.poll(max(0, int(timeout_ms)))
+            now = gl.local_ticks_ms()
+            if ready:
+                msg = self._sock.recv(48)
+                if self._accept(msg, gl.local_ticks_diff(now, self._sent)):
+                    self.close()
+                    self.state = self.DONE
+                    return True
+        except Exception as e:
+            self._fail(f'receive failed ({e})')
+            return False
+        if gl.local_ticks_diff(now, self._sent) >= self.timeout * 1000:
+            self._fail('timeout')
+            return False
+        return None
+
+    # Validate the reply, store time and round trip time
+    def _accept(self, msg, rtt):
+        if len(msg) < 48:
+            return False
+        # leap indicator 3 - server not synchronized, mode 4 - server
+        if msg[0] >> 6 == 3 or msg[0] & 0x07 != 4 or msg[1] == 0:
+            return False
+        if msg[24:32] != self._query[40:48]:
+            return False
+        val = struct.unpack('!I', msg[40:44])[0]
+        frac = struct.unpack('!I', msg[44:48])[0]
+        epoch_year = time.gmtime(0)[0]
+        if epoch_year == 2000:
+            val -= _NTP_DELTA_2000
+        elif epoch_year == 1970:
+            val -= _NTP_DELTA_1970
+        else:
+            return False
+        ms = ((frac >> 16) * 1000 >> 16) + rtt // 2
+        self.utc = val + ms // 1000
+        self.ms = ms % 1000
+        self.rtt = rtt
+        self.received = gl.local_ticks_add(self._sent, rtt)
+        return True
+
+    def _fail(self, error):
+        self.close()
+        self.error = error
+        self.state = self.FAILED
+
+    # Release the socket, the request can be started again
+    def close(self):
+        if self._sock is not None:
+            try:
+                if self._poller is not None:
+                    self._poller.unregister(self._sock)
+                self._sock.close()
+            except Exception:
+                pass
+        self._sock = None
+        self._poller = None
+        if self.state == self.PENDING:
+            self.state = self.IDLE
+
 class LAN:
     def __init__(self):
         # some network implementation do not support STAT_CONNECT_FAIL
@@ -37,6 +173,10 @@ class LAN:
         self.ntp_host = 'pool.ntp.org'
         if 'ntp_host' in self.keys:
             self.ntp_host = self.cfg['ntp_host']
+        # non-blocking RTC update, see ntp_start()
+        self.ntp_request = None
+        self.ntp_ok = 0
+        self.ntp_failed = 0
         self._debug = 'debug' in self.keys and self.cfg['debug']
         if self._debug:
             for key in sorted(self.keys):
@@ -162,6 +302,37 @@ class LAN:
         if self._debug:
             print('Disconnected from LAN')
 
+    # convert the transmit timestamp of an NTP reply to UTC epoch seconds
+    def _ntp_utc(self, msg):
+        val = struct.unpack("!I", msg[40:44])[0]
+
+        EPOCH_YEAR = time.gmtime(0)[0]
+        if EPOCH_YEAR == 2000:
+            NTP_DELTA = _NTP_DELTA_2000
+        elif EPOCH_YEAR == 1970:
+            NTP_DELTA = _NTP_DELTA_1970
+        else:
+            raise Exception("Unsupported epoch: {}".format(EPOCH_YEAR))
+
+        return val - NTP_DELTA
+
+    # set the RTC to UTC epoch seconds
+    def _set_rtc(self, utc):
+        from machine import RTC
+        lt = time.gmtime(utc)
+        RTC().datetime((lt[0], lt[1], lt[2], lt[6], lt[3], lt[4], lt[5], 0))
+        lt = time.gmtime()
+        if self._debug:
+            print(f'UTC time is {lt[3]:02}:{lt[4]:02}:{lt[5]:02} on {lt[2]:02}.{lt[1]:02}.{lt[0]}')
+
+    # Step the RTC to the nearest second of the last NTP reply
+    def step_rtc(self):
+        req = self.ntp_request
+        if req is None or req.state != NTPRequest.DONE:
+            return False
+        self._set_rtc(req.utc + (1 if req.ms >= 500 else 0))
+        return True
+
     # return UTC time from NTP server without TZ/DST modification
     def ntp_socket(self, host, timeout=10):
         NTP_QUERY = bytearray(48)
@@ -189,22 +360,57 @@ class LAN:
                 s.close()
             
         if msgOK:
-            val = struct.unpack("!I", msg[40:44])[0]
-            
-            EPOCH_YEAR = time.gmtime(0)[0]
-            if EPOCH_YEAR == 2000:
-                # (date(2000, 1, 1) - date(1900, 1, 1)).days * 24*60*60
-                NTP_DELTA = 3155673600
-            elif EPOCH_YEAR == 1970:
-                # (date(1970, 1, 1) - date(1900, 1, 1)).days * 24*60*60
-                NTP_DELTA = 2208988800
-            else:
-                raise Exception("Unsupported epoch: {}".format(EPOCH_YEAR))
-
-            return val - NTP_DELTA
+            return self._ntp_utc(msg)
         else:
             return 0
 
+    # Start a non-blocking RTC update, return False if the request could not be sent
+    # Call ntp_poll() until it returns True or False
+    def ntp_start(self, host=None, timeout=10):
+        if not self.is_connected():
+            if self._debug:
+                print('LAN not connected, RTC not updated')
+            self.ntp_failed += 1
+            return False
+        host = self.ntp_host if host is None else host
+        req = self.ntp_request
+        if req is None or req.host != host:
+            req = NTPRequest(host, timeout)
+            self.ntp_request = req
+        req.timeout = timeout
+        if not req.start():
+            self.ntp_failed += 1
+            print(f'NTP request failed ({req.error})')
+            return False
+        return True
+
+    # Wait at most timeout_ms for the NTP reply
+    # Return None while the reply is pending, True if a valid reply was
+    # received (and the RTC updated if apply), False if the request failed
+    def ntp_poll(self, timeout_ms=0, apply=True):
+        req = self.ntp_request
+        if req is None:
+            return False
+        if req.state != NTPRequest.PENDING:
+            return req.state == NTPRequest.DONE
+        result = req.poll(timeout_ms)
+        if result is None:
+            return None
+        if result:
+            self.ntp_ok += 1
+            if apply:
+                self._set_rtc(req.utc)
+            if self._debug:
+                print(f'NTP reply from {req.host}, rtt {req.rtt}ms')
+        else:
+            self.ntp_failed += 1
+            print(f'NTP request failed ({req.error})')
+        return result
+
+    # Return True if a non-blocking RTC update is pending
+    def ntp_pending(self):
+        return self.ntp_request is not None and self.ntp_request.state == NTPRequest.PENDING
+
     # return UTC time from ntptime module
     def ntp_time(self, host=None, timeout=10):
         if not gl.module_available('ntptime'):
@@ -227,19 +433,25 @@ class LAN:
         return 0
 
     def update_rtc(self, host=None, timeout=10):
-        from machine import RTC
         ltime = self.ntp_time(host, timeout)
         if ltime == 0:
             ltime = self.ntp_socket(host, timeout)
         if ltime == 0:
             return False
-        lt = time.gmtime(ltime)
-        RTC().datetime((lt[0], lt[1], lt[2], lt[6], lt[3], lt[4], lt[5], 0))
-        lt = time.gmtime()
-        if self._debug:
-            print(f'UTC time is {lt[3]:02}:{lt[4]:02}:{lt[5]:02} on {lt[2]:02}.{lt[1]:02}.{lt[0]}')
+        self._set_rtc(ltime)
         return True
 
+    # asyncio version of update_rtc, does not reconnect (connect() blocks)
+    async def update_rtc_async(self, host=None, timeout=10, apply=True):
+        import asyncio
+        if not self.ntp_start(host, timeout):
+            return False
+        result = self.ntp_poll(0, apply)
+        while result is None:
+            await asyncio.sleep(0.01)
+            result = self.ntp_poll(0, apply)
+        return result
+
     def url_encode(self, string):
        encoded_string = ""
        for character in string:
@@ -0,0 +1,129 @@
+# platform independent fixed size histograms for timing measurements
+#
+# The counters are stored in preallocated arrays, add() does not allocate
+# memory and can be called once per frame without adding gc pressure.
+#
+#   Linear bins (e.g. frame latency in ms, may be negative)
+#     hist = Histogram(low=-1000, width=10, bins=220)
+#   Power of two bins (e.g. phase durations in us, 0..2**bins-1)
+#     hist = Histogram(bins=24, log=True)
+#
+#   hist.add(val)
+#   hist.dump('latency', 'ms')
+#
+# Notes
+#   Linear histograms count values below low and at or above
+#   low + width * bins in separate under/overflow counters.
+#   Bin i of a log histogram counts values in [2**(i-1), 2**i-1], bin 0
+#   counts values <= 0.
+#   Only the counters are updated per sample, min, max and the last sample
+#   are exact, mean and percentiles are estimated from the bins.
+
+from array import array
+
+class Histogram:
+    def __init__(self, low=0, width=1, bins=32, log=False):
+        self.low = low
+        self.width = width
+        self.bins = bins
+        self.log = log
+        self.counts = array('L', [0] * bins)
+        self.reset()
+
+    # Clear all counters
+    def reset(self):
+        counts = self.counts
+        for i in range(self.bins):
+            counts[i] = 0
+        self.count = 0
+        self.under = 0
+        self.over = 0
+        self.min = 0
+        self.max = 0
+        self.last = 0
+
+    # Add a sample
+    def add(self, val):
+        if self.count == 0 or val < self.min:
+            self.min = val
+        if self.count == 0 or val > self.max:
+            self.max = val
+        self.count += 1
+        self.last = val
+        if self.log:
+            idx = 0
+            while val > 0 and idx < self.bins - 1:
+                val >>= 1
+                idx += 1
+            if val > 0:
+                self.over += 1
+            else:
+                self.counts[idx] += 1
+            return
+        idx = (val - self.low) // self.width
+        if idx < 0:
+            self.under += 1
+        elif idx >= self.bins:
+            self.over += 1
+        else:
+            self.counts[idx] += 1
+
+    # Return the mean value estimated from the bin centers, 0 if no samples
+    # (a running sum would exceed the small int range and allocate)
+    def mean(self):
+        if self.count == 0:
+            return 0
+        total = self.under * self.low + self.over * self.max
+        for i in range(self.bins):
+            total += self.counts[i] * (self._lower(i) + self._upper(i)) / 2
+        return max(self.min, min(self.max, total / self.count))
+
+    # Return the number of samples >= val (bin resolution)
+    def count_above(self, val):
+        cnt = self.over
+        for i in range(self.bins - 1, -1, -1):
+            lwr = self._lower(i)
+            if lwr < val:
+                break
+            cnt += self.counts[i]
+        return cnt
+
+    # Return the approximate value below which pct percent of the samples lie
+    def percentile(self, pct):
+        if self.count == 0:
+            return 0
+        limit = self.count * pct / 100
+        cnt = self.under
+        if cnt >= limit:
+            return self.min
+        for i in range(self.bins):
+            cnt += self.counts[i]
+            if cnt >= limit:
+                return min(self._upper(i), self.max)
+        return self.max
+
+    # Lower bound of bin i
+    def _lower(self, i):
+        if self.log:
+            return 0 if i == 0 else 1 << (i - 1)
+        return self.low + i * self.width
+
+    # Upper bound (inclusive) of bin i
+    def _upper(self, i):
+        if self.log:
+            return (1 << i) - 1 if i > 0 else 0
+        return self.low + (i + 1) * self.width - 1
+
+    # Print the summary and the non-empty bins
+    def dump(self, name='', unit=''):
+        print(f'{name} n={self.count} min={self.min}{unit} mean={self.mean():.1f}{unit} '
+              f'p99={self.percentile(99)}{unit} max={self.max}{unit}')
+        if self.under:
+            print(f'  {"< " + str(self.low):>16}{unit:3}{self.under:8}')
+        for i in range(self.bins):
+            cnt = self.counts[i]
+            if cnt:
+                print(f'  {self._lower(i):7}..{self._upper(i):<7}{unit:3}{cnt:8}')
+        if self.over:
+            limit = 1 << (self.bins - 1) if self.log else self.low + self.bins * self.width
+            print(f'  {">= " + str(limit):>16}{unit:3}{self.over:8}')
@@ -0,0 +1,274 @@
+# run length encoded RGB565 / paletted images for the ST7789 and ST7735 drivers
+#
+# Images are streamed from a binary file, only a read chunk and one row of
+# pixels are held in RAM. Long runs of one color are drawn with fill_rect,
+# literal pixels and short runs are collected in the row buffer and sent
+# with a single window write (ST7789.blit_buffer or ST7735.image) per row
+# segment. Images are created with host/rleconv.py.
+#
+#   with open('splash.rle', 'rb') as stream:
+#       image = RLEImage(stream)
+#       image.draw(display, 0, 0)
+#
+# File format (all values big endian)
+#   0   2   magic b'RI'
+#   2   1   version 1
+#   3   1   bits per pixel, 16 (RGB565) or 8 (palette index)
+#   4   2   width
+#   6   2   height
+#   8   2   palette colors n (0 for RGB565 images)
+#   10  2n  palette, 565 encoded colors
+#   records, pixels in row order, a record may span rows
+#     c < 128   literal of c + 1 pixels, the pixel values follow
+#     c >= 128  run of c - 126 pixels, one pixel value follows
+#   pixel values are 565 encoded colors (2 bytes) or palette indices (1 byte)
+#
+# Notes
+#   The image must be on screen, no clipping is done.
+#   Runs of min_fill or more pixels in a row are drawn with fill_rect,
+#   consecutive runs of the same color are merged, runs covering whole
+#   rows are drawn as one rectangle.
+#   The row buffer holds big endian colors unless the display expects
+#   little endian data (ST7789 needs_swap).
+
+import struct
+from array import array
+
+_MAGIC = b'RI\x01'
+_HEADER_SIZE = 10
+
+# minimum run length (pixels) drawn with fill_rect
+_MIN_FILL = 16
+
+# read chunk size (bytes), must hold the largest record (129 RGB565 pixels)
+_CHUNK_SIZE = 512
+
+class RLEImage:
+    def __init__(self, stream):
+        self.stream = stream
+        header = bytearray(_HEADER_SIZE)
+        if stream.readinto(header) != _HEADER_SIZE or header[:3] != _MAGIC:
+            raise ValueError('not an RLE image')
+        self.bits = header[3]
+        self.width, self.height, colors = struct.unpack('>HHH', header[4:])
+        if self.bits not in (8, 16):
+            raise ValueError(f'unsupported RLE image depth {self.bits}')
+        data = bytearray(colors * 2)
+        stream.readinto(data)
+        self.palette = [struct.unpack_from('>H', data, i * 2)[0] for i in range(colors)]
+        self._start = _HEADER_SIZE + colors * 2
+        self._chunk = bytearray(_CHUNK_SIZE)
+        self._mv = memoryview(self._chunk)
+        # palette in row buffer byte order, True if the row buffer holds
+        # big endian colors, viper parameters (see _expand())
+        self._lut = array('H', [0] * 256)
+        self._swap = None
+        self._params = array('H', [0, 0, 0])
+        self._drawn = False
+        # statistics of the last draw
+        self.fills = 0
+        self.blits = 0
+
+    # Draw the image with the top left corner at x, y. The stream is
+    # rewound to the first record if it was drawn before.
+    def draw(self, display, x, y, min_fill=_MIN_FILL):
+        if self._drawn:
+            self.stream.seek(self._start)
+        self._drawn = True
+        swap = not ('needs_swap' in dir(display) and display.needs_swap)
+        if swap != self._swap:
+            lut = self._lut
+            for i in range(len(self.palette)):
+                color = self.palette[i]
+                lut[i] = ((color & 0xFF) << 8) | (color >> 8) if swap else color
+            self._swap = swap
+        self._display = display
+        self._blit = 'blit_buffer' in dir(display)
+        self._x = x
+        self._y = y
+        self._min_fill = min_fill
+        self._line = memoryview(bytearray(self.width * 2))
+        self._col = 0
+        self._row = 0
+        self._pending = 0
+        self.fills = 0
+        self.blits = 0
+        self._pos = 0
+        self._end = 0
+
+        transaction = 'begin' in dir(display)
+        if transaction:
+            display.begin()
+        try:
+            self._decode()
+        finally:
+            if transaction:
+                display.end()
+        self._display = None
+        self._line = None
+
+    # Decode the records, consecutive runs of the same color are merged
+    def _decode(self):
+        wide = self.bits == 16
+        palette = self.palette
+        left = self.width * self.height
+        run_color = 0
+        run_count = 0
+        chunk = self._chunk
+        while left > 0:
+            pos = self._read(1)
+            if pos < 0:
+                break
+            ctrl = chunk[pos]
+            if ctrl >= 128:
+                count = min(ctrl - 126, left)
+                pos = self._read(2 if wide else 1)
+                if pos < 0:
+                    break
+                if wide:
+                    color = (chunk[pos] << 8) | chunk[pos + 1]
+                else:
+                    color = palette[chunk[pos]]
+                if run_count and color != run_color:
+                    self._run(run_color, run_count)
+                    run_count = 0
+                run_color = color
+                run_count += count
+            else:
+                if run_count:
+                    self._run(run_color, run_count)
+                    run_count = 0
+                count = min(ctrl + 1, left)
+                pos = self._read(count * 2 if wide else count)
+                if pos < 0:
+                    break
+                self._literal(pos, count, wide)
+            left -= count
+        if run_count:
+            self._run(run_color, run_count)
+        self._flush()
+
+    # Return the chunk offset of the next n bytes of the stream, -1 at the
+    # end of the stream
+    def _read(self, n):
+        if self._end - self._pos < n:
+            rest = self._end - self._pos
+            mv = self._mv
+            mv[:rest] = mv[self._pos:self._end]
+            self._end = rest + (self.stream.readinto(mv[rest:]) or 0)
+            self._pos = 0
+            if self._end < n:
+                return -1
+        pos = self._pos
+        self._pos += n
+        return pos
+
+    # Draw count pixels of color
+    def _run(self, color, count):
+        width = self.width
+        line = self._line
+        while count > 0:
+            col = self._col
+            if col == 0 and count >= width:
+                # whole rows
+                rows = count // width
+                self._fill(0, width, rows, color)
+                self._row += rows
+                count -= rows * width
+                continue
+            cnt = min(count, width - col)
+            if cnt >= self._min_fill:
+                self._flush()
+                self._fill(col, cnt, 1, color)
+                self._pending = col + cnt
+            else:
+                if self._swap:
+                    first = color >> 8
+                    second = color & 0xFF
+                else:
+                    first = color & 0xFF
+                    second = color >> 8
+                for i in range(col * 2, (col + cnt) * 2, 2):
+                    line[i] = first
+                    line[i + 1] = second
+            self._advance(cnt)
+            count -= cnt
+
+    # Copy count literal pixels at chunk offset pos into the row buffer
+    def _literal(self, pos, count, wide):
+        width = self.width
+        while count > 0:
+            col = self._col
+            cnt = min(count, width - col)
+            if wide:
+                self._line[col * 2:(col + cnt) * 2] = self._mv[pos:pos + cnt * 2]
+                if not self._swap:
+                    self._swap_bytes(self._line, col, cnt)
+                pos += cnt * 2
+            else:
+                params = self._params
+                params[0] = pos
+                params[1] = col
+                params[2] = cnt
+                self._expand(self._chunk, self._lut, self._line, params)
+                pos += cnt
+            self._advance(cnt)
+            count -= cnt
+
+    @micropython.viper
+    @staticmethod
+    def _expand(data, lut, line, params):
+        # Expand palette indices to colors in row buffer byte order
+        param = ptr16(params)
+        src = ptr8(data)
+        table = ptr16(lut)
+        dst = ptr16(line)
+        s = param[0]
+        d = param[1]
+        for i in range(param[2]):
+            dst[d + i] = table[src[s + i]]
+
+    @micropython.viper
+    @staticmethod
+    def _swap_bytes(line, col: int, count: int):
+        # Convert big endian pixels to little endian in place
+        buf = ptr8(line)
+        for i in range(col * 2, (col + count) * 2, 2):
+            hi = buf[i]
+            buf[i] = buf[i + 1]
+            buf[i + 1] = hi
+
+    # Advance the current column, the row is sent at its end
+    def _advance(self, count):
+        self._col += count
+        if self._col >= self.width:
+            self._flush()
+            self._col = 0
+            self._pending = 0
+            self._row += 1
+
+    # Send the collected pixels of the current row
+    def _flush(self):
+        start = self._pending
+        count = self._col - start
+        if count <= 0:
+            return
+        data = self._line[start * 2:self._col * 2]
+        x = self._x + start
+        y = self._y + self._row
+        if self._blit:
+            self._display.blit_buffer(data, x, y, count, 1)
+        else:
+            self._display.image(x, y, x + count - 1, y, data)
+        self._pending = self._col
+        self.blits += 1
+
+    # Fill count columns of rows rows from column col of the current row
+    def _fill(self, col, count, rows, color):
+        x = self._x + col
+        y = self._y + self._row
+        if self._blit:
+            self._display.fill_rect(x, y, count, rows, color)
+        else:
+            self._display.fill_rect((x, y), (count, rows), color)
+        self.fills += 1
@@ -0,0 +1,188 @@
+# platform independent scheduler to render exactly once per RTC second
+#
+# The scheduler does not sleep itself. The caller asks poll() if a frame
+# is due and otherwise sleeps for delay() milliseconds. This allows the
+# same scheduler to be driven by a blocking loop, asyncio or lightsleep.
+#
+#   sched = SecondScheduler(phase_ms=30)
+#   while True:
+#       ahead = sched.poll()
+#       if ahead is None:
+#           time.sleep(sched.delay() / 1000)
+#           continue
+#       render(time.time() + ahead)
+#
+# Notes
+#   The RTC second boundary is located by polling the RTC and then tracked
+#   with the millisecond tick counter. The schedule is realigned to the RTC
+#   every 'resync' frames to compensate for tick/RTC drift.
+#   Frames are due phase_ms before the RTC second boundary so the display
+#   is already updated when the second turns over. If the RTC has not yet
+#   turned over when the frame is due, poll() returns 1 and the caller
+#   renders the following second, else poll() returns 0.
+
+import time
+import genlib as gl
+
+# periodic realignment starts polling this many ms before the boundary
+_MARGIN_MS = 50
+
+# RTC polling interval while locating a boundary (ms)
+_POLL_MS = 2
+
+# give up if the RTC does not turn over within this time (ms)
+_ANCHOR_TIMEOUT_MS = 1200
+
+# a turnover is located exactly if the previous RTC read was at most
+# this many ms earlier
+_EXACT_MS = 10
+
+# read the current RTC second
+def rtc_second():
+    return int(time.time())
+
+class SecondScheduler:
+    def __init__(self, phase_ms=0, resync=60, read=rtc_second):
+        self._read = read
+        self.resync = resync
+        self.phase_ms = phase_ms
+        # statistics
+        self.frames = 0
+        self.wakeups = 0
+        self.late = 0
+        self.syncs = 0
+        self.sync()
+
+    # Return the frame lead (ms before the RTC boundary)
+    @property
+    def phase_ms(self):
+        return self._lead
+
+    # Set the frame lead, limited to less than one second
+    @phase_ms.setter
+    def phase_ms(self, val):
+        self._lead = max(-900, min(900, int(val)))
+
+    # Tick value of the second boundary targeted by the last frame
+    @property
+    def target(self):
+        return self._frame_target
+
+    # Return the RTC time (seconds, ms) at tick value tick estimated from
+    # the boundary of the last frame, None before the first frame or if
+    # the RTC turnover has not yet been located exactly
+    def rtc_time(self, tick):
+        if self._shown is None or not self._exact:
+            return None
+        ms = gl.local_ticks_diff(tick, self._frame_target)
+        return self._shown + ms // 1000, ms % 1000
+
+    # Restart the schedule, e.g. after the RTC has been stepped
+    # The first frame is rendered as soon as the RTC turns over
+    def sync(self):
+        now = gl.local_ticks_ms()
+        self._started = False
+        self._shown = None
+        self._target = now
+        self._frame_target = now
+        self._next = now
+        self._count = 0
+        self._exact = False
+        self._anchor(now, now, self._read())
+
+    # Start polling for the turnover from RTC second sec expected at tick value expect
+    def _anchor(self, start, expect, sec):
+        self._anchor_sec = sec
+        self._anchor_read = gl.local_ticks_ms()
+        self._anchor_start = start
+        self._anchor_expect = expect
+        self._anchor_limit = gl.local_ticks_add(start, _ANCHOR_TIMEOUT_MS)
+
+    # Return the number of ms the caller may sleep before calling poll()
+    def delay(self):
+        now = gl.local_ticks_ms()
+        wait = gl.local_ticks_diff(self._next, now) if self._started else 1000
+        if self._anchor_start is not None:
+            until = gl.local_ticks_diff(self._anchor_start, now)
+            wait = min(wait, max(until, _POLL_MS))
+        return max(0, wait)
+
+    # Return None if no frame is due, else the number of seconds (0|1)
+    # the caller must add to the current RTC time to render the frame
+    def poll(self):
+        self.wakeups += 1
+        now = gl.local_ticks_ms()
+
+        # Locate the RTC turnover and shift the schedule accordingly
+        if self._anchor_start is not None and gl.local_ticks_diff(now, self._anchor_start) >= 0:
+            if self._read() != self._anchor_sec:
+                self._anchor_start = None
+                self.syncs += 1
+                # realign at the next turnover if this one was not located exactly
+                self._exact = gl.local_ticks_diff(now, self._anchor_read) <= _EXACT_MS
+                if not self._exact:
+                    self._count = self.resync
+                if self._started:
+                    delta = gl.local_ticks_diff(now, self._anchor_expect)
+                    self._target = gl.local_ticks_add(self._target, delta)
+                    self._next = gl.local_ticks_add(self._next, delta)
+                else:
+                    # first boundary found, render immediately
+                    self._started = True
+                    self._target = now
+                    self._next = now
+            elif gl.local_ticks_diff(now, self._anchor_limit) >= 0:
+                # RTC not running, continue with the tick based schedule
+                self._anchor_start = None
+                self._exact = False
+                if not self._started:
+                    self._started = True
+                    self._target = now
+                    self._next = now
+            else:
+                self._anchor_read = now
+
+        if not self._started or gl.local_ticks_diff(now, self._next) < 0:
+            return None
+
+        # Frame due, determine which second to render
+        sec = self._read()
+        restart = False
+        if self._shown is None:
+            ahead = 0
+        elif sec == self._shown:
+            ahead = 1
+        elif sec == self._shown + 1:
+            ahead = 0
+        else:
+            # RTC stepped, render the current time and realign
+            ahead = 0
+            restart = True
+        self._shown = sec + ahead
+        self.frames += 1
+
+        # Frame(s) missed, render now and realign
+        if gl.local_ticks_diff(now, self._next) >= 1000:
+            self.late += 1
+            restart = True
+
+        target = self._target
+        if restart:
+            self.sync()
+            self._shown = sec + ahead
+            self._frame_target = target
+            return ahead
+        self._frame_target = target
+        self._target = gl.local_ticks_add(self._target, 1000)
+        self._next = gl.local_ticks_add(self._target, -self._lead)
+
+        # Periodic realignment at the next RTC turnover
+        self._count += 1
+        if self._count >= self.resync and self._anchor_start is None:
+            self._count = 0
+            expect = self._target if ahead == 0 else self._frame_target
+            start = gl.local_ticks_add(expect, -_MARGIN_MS)
+            if gl.local_ticks_diff(start, now) < 0:
+                start = now
+            self._anchor(start, expect, sec)
+        return ahead
@@ -0,0 +1,83 @@
+# platform independent shadow model of the virtual pixel grid
+#
+# The grid records the color of each virtual pixel and colon dot. Callers
+# write the grid freely using the DAL xy_set/dot_set API and call commit()
+# once per frame. commit() writes only the cells that changed since the
+# last commit to the display and calls display.show() once.
+#
+#   grid = ShadowGrid(display, bcolor)
+#   grid.xy_set(0, 3, hcolor)
+#   grid.dot_set(2, 1, ccolor)
+#   grid.commit()
+#
+# Notes
+#   reset() must be called after the display has been filled with the
+#   background color outside of the grid, e.g. display.fill(bcolor).
+#   A repainted virtual pixel covers a dot at the same position, the dot
+#   is redrawn in the same commit.
+
+class ShadowGrid:
+    def __init__(self, display, bcolor, cols=8, rows=4):
+        self.display = display
+        self.cols = cols
+        self.rows = rows
+        self.commits = 0
+        self.writes = 0
+        self.reset(bcolor)
+
+    # Forget the displayed state, all cells have the given background color
+    def reset(self, bcolor=None):
+        if bcolor is not None:
+            self.bcolor = bcolor
+        cnt = self.cols * self.rows
+        self._shown = [self.bcolor] * cnt
+        self._cells = [self.bcolor] * cnt
+        # None - no dot displayed
+        self._shown_dots = [None] * cnt
+        self._dots = [None] * cnt
+        self._dirty = False
+
+    # Return the pending color of the virtual pixel at x, y
+    def xy_get(self, x, y):
+        return self._cells[x + y * self.cols]
+
+    # set single virtual 'pixel' at x, y to color (pending until commit)
+    def xy_set(self, x, y, color):
+        self._cells[x + y * self.cols] = color
+        self._dirty = True
+
+    # set single virtual 'dot' at x, y to color (pending until commit)
+    def dot_set(self, x, y, color):
+        self._dots[x + y * self.cols] = color
+        self._dirty = True
+
+    # Write the changed cells to the display
+    # If show is True and cells were written, call display.show() once
+    # Return the number of cells written
+    def commit(self, show=True):
+        cnt = 0
+        if self._dirty:
+            display = self.display
+            cols = self.cols
+            cells = self._cells
+            shown = self._shown
+            dots = self._dots
+            shown_dots = self._shown_dots
+            for i in range(len(cells)):
+                color = cells[i]
+                repaint = color != shown[i]
+                if repaint:
+                    display.xy_set(i % cols, i // cols, color)
+                    shown[i] = color
+                    cnt += 1
+                dot = dots[i]
+                if dot is not None and (repaint or dot != shown_dots[i]):
+                    display.dot_set(i % cols, i // cols, dot)
+                    cnt += 1
+                shown_dots[i] = dot
+            self._dirty = False
+        self.writes += cnt
+        if show and cnt > 0:
+            self.commits += 1
+            self.display.show()
+        return cnt
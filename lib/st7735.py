@@ -12,10 +12,14 @@
 # Modified rotation to use rotate offset
 # Made size() a property
 # Added optional drive parameter for ESP32 support
+# Added cached fill chunks (set_fill_cache) and coalesced window setup
+# Added single window glyph rendering and text batching
+# Replaced circle/fillcircle by integer span drawing, added ellipse/fillellipse
+# Added allocation free integer API (fill_rect_xywh, hline_xyl, vline_xyl, ...)
 
 from machine import Pin
+from array import array
 import time
-from math import sqrt
 import tftcolor as TFT
 import genlib as gl
 
@@ -42,6 +46,21 @@ def clamp( aValue, aMin, aMax ) :
 
 ScreenSize = (128, 160)
 
+#Default pixels per fill chunk and byte budget of the fill chunk cache.
+_FILL_CHUNK = 512
+_FILL_CACHE_SIZE = 4096
+
+#Tail views of a fill chunk kept for reuse.
+_FILL_TAILS = 16
+
+#Maximum bytes of the text buffer, longer strings are sent in several windows.
+_TEXT_BUFFER_SIZE = 4096
+
+#Preallocated command bytes of the window setup.
+_CASET = b'\x2a'
+_RASET = b'\x2b'
+_RAMWR = b'\x2c'
+
 class ST7735(object) :
   """Sainsmart TFT 7735 display driver."""
 
@@ -99,9 +118,12 @@ class ST7735(object) :
     '''Create a 565 rgb TFTColor value'''
     return TFT.color565(aR, aG, aB)
 
-  def __init__( self, spi, aDC, aReset, aCS, drive=-1) :
+  def __init__( self, spi, aDC, aReset, aCS, drive=-1, fill_chunk=_FILL_CHUNK,
+                fill_cache=_FILL_CACHE_SIZE) :
     """aLoc SPI pin location is either 1 for 'X' or 2 for 'Y'.
-       aDC is the DC pin and aReset is the reset pin."""
+       aDC is the DC pin and aReset is the reset pin.
+       fill_chunk is the number of pixels sent per fill transfer, fill_cache
+       the byte budget of the cached fill chunks (see set_fill_cache)."""
     self._size = ScreenSize
     self._offset = bytearray([0,0])
     self.rotate = 0                    #Vertical with top toward pins.
@@ -121,11 +143,24 @@ class ST7735(object) :
     self.colorData = bytearray(2)
     self.windowLocData = bytearray(4)
     self.bkgColor = TFT.BLACK
+    self._command = bytearray(1)
+    self.set_fill_cache(fill_cache, fill_chunk)
+    #Glyph rows of the fonts by id, text buffer and glyph parameters.
+    self._glyphs = {}
+    self._textbuf = None
+    self._textparams = array('H', [0] * 10)
+    #Column and row range of the last window, -1 if unknown.
+    self._invalidate()
 
   @property
   def size( self ) :
     return self._size
 
+  @property
+  def offset( self ) :
+    '''Column and row of the screen origin in the frame memory.'''
+    return self._offset
+
 #   @micropython.native
   def on( self, aTF = True ) :
     '''Turn display on or off.'''
@@ -159,16 +194,24 @@ class ST7735(object) :
 #  @micropython.native
   def pixel( self, aPos, aColor ) :
     '''Draw a pixel at the given position'''
-    if 0 <= aPos[0] < self._size[0] and 0 <= aPos[1] < self._size[1]:
-      self._setwindowpoint(aPos)
+    self.pixel_xy(aPos[0], aPos[1], aColor)
+
+#  @micropython.native
+  def pixel_xy( self, x, y, aColor ) :
+    '''Draw a pixel at x, y.'''
+    if 0 <= x < self._size[0] and 0 <= y < self._size[1]:
+      self._setwindow(x, y, x, y)
       self._pushcolor(aColor)
 
 #   @micropython.native
-  def text( self, aPos, aString, aColor, aFont, aSize = 1, nowrap = False ) :
+  def text( self, aPos, aString, aColor, aFont, aSize = 1, nowrap = False, batch = False ) :
     '''Draw a text at the given position.  If the string reaches the end of the
        display it is wrapped to aPos[0] on the next line.  aSize may be an integer
        which will size the font uniformly on w,h or a or any type that may be
-       indexed with [0] or [1].'''
+       indexed with [0] or [1].
+       batch sends the characters of each line with one window write, the
+       column between the characters and characters missing in the font are
+       drawn in the background color.'''
 
     if aFont is None:
       return
@@ -181,6 +224,9 @@ class ST7735(object) :
 
     px, py = aPos
     width = wh[0] * aFont["Width"] + 1
+    if batch and aFont["Width"] <= 8:
+      self._textbatch(px, py, aString, aColor, aFont, wh, nowrap)
+      return
     for c in aString:
       self.char((px, py), c, aColor, aFont, wh)
       px += width
@@ -206,123 +252,285 @@ class ST7735(object) :
     if aFont is None:
       return
 
-    bColor = self.bkgColor
-    
-    startchar = aFont['Start']
-    endchar = aFont['End']
-
     ci = ord(aChar)
-    if (startchar <= ci <= endchar):
+    if not (aFont['Start'] <= ci <= aFont['End']):
+      return
+
+    fontw = aFont['Width']
+    if fontw > 8:
+      self._charcolumns(aPos, ci, aColor, aFont, aSizes)
+      return
+
+    sx = max(1, int(aSizes[0]))
+    sy = max(1, int(aSizes[1]))
+    w = fontw * sx
+    h = aFont['Height'] * sy
+    buf = self._textbuffer(w * h * 2)
+    self._render(aFont, ci, aColor, sx, sy, w, 0, 0)
+    self._sendtext(aPos[0], aPos[1], w, h, buf)
+
+  def _textbatch( self, px, py, aString, aColor, aFont, wh, nowrap ) :
+    '''Draw the characters of each text line with one window write.'''
+    sx = max(1, int(wh[0]))
+    sy = max(1, int(wh[1]))
+    w = aFont['Width'] * sx
+    h = aFont['Height'] * sy
+    width = wh[0] * aFont['Width'] + 1
+    #Characters per window limited by the text buffer size.
+    most = max(1, _TEXT_BUFFER_SIZE // ((w + 1) * h * 2))
+    left = px
+    x0 = px
+    start = 0
+    last = len(aString) - 1
+    for i in range(len(aString)):
+      px += width
+      wrap = px + width > self._size[0]
+      if wrap or i == last or i - start + 1 == most:
+        self._textrun(x0, py, aString, start, i - start + 1, aColor, aFont, sx, sy)
+        start = i + 1
+        x0 = px
+      if wrap:
+        if nowrap:
+          break
+        py += aFont['Height'] * wh[1] + 1
+        px = x0 = left
+
+  def _textrun( self, x, y, aString, start, count, aColor, aFont, sx, sy ) :
+    '''Render count characters of aString from start side by side and send
+       them with one window write.'''
+    w = aFont['Width'] * sx
+    h = aFont['Height'] * sy
+    stride = count * (w + 1) - 1
+    buf = self._textbuffer(stride * h * 2)
+    col = 0
+    for i in range(start, start + count):
+      self._render(aFont, ord(aString[i]), aColor, sx, sy, stride, col, 1)
+      col += w + 1
+    self._sendtext(x, y, stride, h, buf)
+
+  def _fontrows( self, aFont ) :
+    '''Return the glyph rows of aFont, bit n of a row is column n of the
+       glyph. The rows are created on first use and cached, a blank glyph
+       follows the last character.'''
+    rows = self._glyphs.get(id(aFont))
+    if rows is None:
       fontw = aFont['Width']
       fonth = aFont['Height']
-      ci = (ci - startchar) * fontw
-
-      charA = aFont["Data"][ci:ci + fontw]
-      px = aPos[0]
-      if aSizes[0] <= 1 and aSizes[1] <= 1 :
-        buf = bytearray(2 * fonth * fontw)
-        for q in range(fontw) :
-          c = charA[q]
-          for r in range(fonth) :
-            if c & 0x01 :
-              pos = 2 * (r * fontw + q)
-              buf[pos] = aColor >> 8
-              buf[pos + 1] = aColor & 0xff
-            else:
-              pos = 2 * (r * fontw + q)
-              buf[pos] = bColor >> 8
-              buf[pos + 1] = bColor & 0xff
-            c >>= 1
-        self.image(aPos[0], aPos[1], aPos[0] + fontw - 1, aPos[1] + fonth - 1, buf)
-      else:
-        for c in charA :
-          py = aPos[1]
-          for r in range(fonth) :
-            if c & 0x01 :
-              self.fill_rect((px, py), aSizes, aColor)
-            else:
-              self.fill_rect((px, py), aSizes, bColor)
-            py += aSizes[1]
-            c >>= 1
-          px += aSizes[0]
+      data = aFont['Data']
+      count = min(aFont['End'] - aFont['Start'] + 1, len(data) // fontw)
+      rows = bytearray((count + 1) * fonth)
+      for c in range(count):
+        for q in range(fontw):
+          bits = data[c * fontw + q]
+          for r in range(fonth):
+            if bits & (1 << r):
+              rows[c * fonth + r] |= 1 << q
+      self._glyphs[id(aFont)] = rows
+    return rows
+
+  def _textbuffer( self, aSize ) :
+    '''Return the text buffer, grown to at least aSize bytes.'''
+    buf = self._textbuf
+    if buf is None or len(buf) < aSize:
+      buf = memoryview(bytearray(aSize))
+      self._textbuf = buf
+    return buf
+
+  def _render( self, aFont, ci, aColor, sx, sy, stride, col, gap ) :
+    '''Render character ci scaled by sx, sy into the text buffer at pixel
+       column col of rows of stride pixels. gap background pixels follow the
+       glyph if they fit in the row.'''
+    rows = self._fontrows(aFont)
+    fonth = aFont['Height']
+    index = ci - aFont['Start']
+    if index < 0 or (index + 1) * fonth >= len(rows):
+      index = len(rows) // fonth - 1
+    bColor = self.bkgColor
+    params = self._textparams
+    #The buffer holds big endian colors, ptr16 stores little endian.
+    params[0] = ((aColor & 0xFF) << 8) | (aColor >> 8)
+    params[1] = ((bColor & 0xFF) << 8) | (bColor >> 8)
+    params[2] = index * fonth
+    params[3] = aFont['Width']
+    params[4] = fonth
+    params[5] = sx
+    params[6] = sy
+    params[7] = stride
+    params[8] = col
+    params[9] = min(gap, stride - col - aFont['Width'] * sx)
+    self._glyph(rows, self._textbuf, params)
+
+  @micropython.viper
+  @staticmethod
+  def _glyph( rows, buffer, params ) :
+    '''Expand the glyph rows to colors, each row is written once and copied
+       for the vertical scale.'''
+    p = ptr16(params)
+    src = ptr8(rows)
+    dst = ptr16(buffer)
+    fg = p[0]
+    bg = p[1]
+    index = p[2]
+    width = p[3]
+    sx = p[5]
+    sy = p[6]
+    stride = p[7]
+    gap = p[9]
+    pixels = width * sx + gap
+    line = p[8]
+    for r in range(p[4]):
+      bits = src[index + r]
+      d = line
+      for q in range(width):
+        color = fg if bits & 1 else bg
+        for i in range(sx):
+          dst[d] = color
+          d += 1
+        bits >>= 1
+      for i in range(gap):
+        dst[d] = bg
+        d += 1
+      d = line + stride
+      for j in range(1, sy):
+        for k in range(pixels):
+          dst[d + k] = dst[line + k]
+        d += stride
+      line = d
+
+  def _sendtext( self, x, y, w, h, buf ) :
+    '''Send the w x h pixels of the text buffer to x, y. The parts beyond the
+       edges of the screen are clipped, nothing is sent if the text is
+       entirely off screen.'''
+    left = max(0, -x)
+    top = max(0, -y)
+    vw = min(w, self._size[0] - x) - left
+    vh = min(h, self._size[1] - y) - top
+    if vw <= 0 or vh <= 0:
+      return
+    if vw == w:
+      data = buf[top * w * 2:(top + vh) * w * 2]
+    else:
+      #Compact the visible rows to the start of the buffer.
+      for r in range(vh):
+        src = ((top + r) * w + left) * 2
+        buf[r * vw * 2:(r + 1) * vw * 2] = buf[src:src + vw * 2]
+      data = buf[:vw * vh * 2]
+    x += left
+    y += top
+    self.image(x, y, x + vw - 1, y + vh - 1, data)
+
+  def _charcolumns( self, aPos, ci, aColor, aFont, aSizes ) :
+    '''Draw a character of a font wider than 8 pixels, each pixel is drawn
+       as a rectangle of aSizes.'''
+    fontw = aFont['Width']
+    ci = (ci - aFont['Start']) * fontw
+    px = aPos[0]
+    for c in aFont['Data'][ci:ci + fontw] :
+      py = aPos[1]
+      for r in range(aFont['Height']) :
+        self.fill_rect((px, py), aSizes, aColor if c & 0x01 else self.bkgColor)
+        py += aSizes[1]
+        c >>= 1
+      px += aSizes[0]
 
 #   @micropython.native
   def line( self, aStart, aEnd, aColor ) :
-    '''Draws a line from aStart to aEnd in the given color.  Vertical or horizontal
-       lines are forwarded to vline and hline.'''
-    if aStart[0] == aEnd[0]:
-      #Make sure we use the smallest y.
-      pnt = aEnd if (aEnd[1] < aStart[1]) else aStart
-      self.vline(pnt, abs(aEnd[1] - aStart[1]) + 1, aColor)
-    elif aStart[1] == aEnd[1]:
-      #Make sure we use the smallest x.
-      pnt = aEnd if aEnd[0] < aStart[0] else aStart
-      self.hline(pnt, abs(aEnd[0] - aStart[0]) + 1, aColor)
+    '''Draws a line from aStart to aEnd in the given color.'''
+    self.line_xy(aStart[0], aStart[1], aEnd[0], aEnd[1], aColor)
+
+#   @micropython.native
+  def line_xy( self, x0, y0, x1, y1, aColor ) :
+    '''Draws a line from x0, y0 to x1, y1 in the given color. Vertical and
+       horizontal lines include the end point, other lines end one step
+       before it. Pixels on the same row (or column) are drawn as one run.'''
+    if x0 == x1:
+      self._rect(x0, min(y0, y1), x0, max(y0, y1), aColor)
+      return
+    if y0 == y1:
+      self._rect(min(x0, x1), y0, max(x0, x1), y0, aColor)
+      return
+
+    dx = x1 - x0
+    dy = y1 - y0
+    inx = 1 if dx > 0 else -1
+    iny = 1 if dy > 0 else -1
+
+    dx = abs(dx)
+    dy = abs(dy)
+    if (dx >= dy):
+      dy <<= 1
+      e = dy - dx
+      dx <<= 1
+      run = x0
+      while (x0 != x1):
+        if (e >= 0):
+          self._rect(min(run, x0), y0, max(run, x0), y0, aColor)
+          run = x0 + inx
+          y0 += iny
+          e -= dx
+        e += dy
+        x0 += inx
+      if run != x1:
+        x0 -= inx
+        self._rect(min(run, x0), y0, max(run, x0), y0, aColor)
     else:
-      px, py = aStart
-      ex, ey = aEnd
-      dx = ex - px
-      dy = ey - py
-      inx = 1 if dx > 0 else -1
-      iny = 1 if dy > 0 else -1
-
-      dx = abs(dx)
-      dy = abs(dy)
-      if (dx >= dy):
-        dy <<= 1
-        e = dy - dx
-        dx <<= 1
-        while (px != ex):
-          self.pixel((px, py), aColor)
-          if (e >= 0):
-            py += iny
-            e -= dx
-          e += dy
-          px += inx
-      else:
-        dx <<= 1
-        e = dx - dy
-        dy <<= 1
-        while (py != ey):
-          self.pixel((px, py), aColor)
-          if (e >= 0):
-            px += inx
-            e -= dy
-          e += dx
-          py += iny
+      dx <<= 1
+      e = dx - dy
+      dy <<= 1
+      run = y0
+      while (y0 != y1):
+        if (e >= 0):
+          self._rect(x0, min(run, y0), x0, max(run, y0), aColor)
+          run = y0 + iny
+          x0 += inx
+          e -= dy
+        e += dx
+        y0 += iny
+      if run != y1:
+        y0 -= iny
+        self._rect(x0, min(run, y0), x0, max(run, y0), aColor)
 
 #   @micropython.native
   def vline( self, aStart, aLen, aColor ) :
     '''Draw a vertical line from aStart for aLen. aLen may be negative.'''
-    start = (clamp(aStart[0], 0, self._size[0]), clamp(aStart[1], 0, self._size[1]))
-    stop = (start[0], clamp(start[1] + aLen, 0, self._size[1]))
-    #Make sure smallest y 1st.
-    if (stop[1] < start[1]):
-      start, stop = stop, start
-    self._setwindowloc(start, stop)
-    self._setColor(aColor)
-    self._draw(aLen)
+    self.vline_xyl(aStart[0], aStart[1], aLen, aColor)
 
 #   @micropython.native
   def hline( self, aStart, aLen, aColor ) :
     '''Draw a horizontal line from aStart for aLen. aLen may be negative.'''
-    start = (clamp(aStart[0], 0, self._size[0]), clamp(aStart[1], 0, self._size[1]))
-    stop = (clamp(start[0] + aLen, 0, self._size[0]), start[1])
-    #Make sure smallest x 1st.
-    if (stop[0] < start[0]):
-      start, stop = stop, start
-    self._setwindowloc(start, stop)
-    self._setColor(aColor)
-    self._draw(aLen)
+    self.hline_xyl(aStart[0], aStart[1], aLen, aColor)
 
 #   @micropython.native
   def rect( self, aStart, aSize, aColor ) :
     '''Draw a hollow rectangle.  aStart is the smallest coordinate corner
        and aSize is a tuple indicating width, height.'''
-    self.hline(aStart, aSize[0], aColor)
-    self.hline((aStart[0], aStart[1] + aSize[1] - 1), aSize[0], aColor)
-    self.vline(aStart, aSize[1], aColor)
-    self.vline((aStart[0] + aSize[0] - 1, aStart[1]), aSize[1], aColor)
+    self.rect_xywh(aStart[0], aStart[1], aSize[0], aSize[1], aColor)
+
+#   @micropython.native
+  def rect_xywh( self, x, y, w, h, aColor ) :
+    '''Draw a hollow rectangle of w x h pixels at x, y.'''
+    self.hline_xyl(x, y, w, aColor)
+    self.hline_xyl(x, y + h - 1, w, aColor)
+    self.vline_xyl(x, y, h, aColor)
+    self.vline_xyl(x + w - 1, y, h, aColor)
+
+#   @micropython.native
+  def hline_xyl( self, x, y, aLen, aColor ) :
+    '''Draw a horizontal line of aLen pixels from x, y, clipped to the
+       screen. A negative aLen draws to the left of x.'''
+    if aLen > 0:
+      self._rect(x, y, x + aLen - 1, y, aColor)
+    elif aLen < 0:
+      self._rect(x + aLen + 1, y, x, y, aColor)
+
+#   @micropython.native
+  def vline_xyl( self, x, y, aLen, aColor ) :
+    '''Draw a vertical line of aLen pixels from x, y, clipped to the
+       screen. A negative aLen draws above y.'''
+    if aLen > 0:
+      self._rect(x, y, x, y + aLen - 1, aColor)
+    elif aLen < 0:
+      self._rect(x, y + aLen + 1, x, y, aColor)
 
 #   @micropython.native
   def fill_rect( self, aStart, aSize, aColor ) :
@@ -345,58 +553,146 @@ class ST7735(object) :
     self._setColor(aColor)
     self._draw(numPixels)
 
+#   @micropython.native
+  def fill_rect_xywh( self, x, y, w, h, aColor ) :
+    '''Draw a filled rectangle of w x h pixels at x, y, clipped to the
+       screen. Nothing is allocated on the heap.'''
+    if w > 0 and h > 0:
+      self._rect(x, y, x + w - 1, y + h - 1, aColor)
+
 #   @micropython.native
   def circle( self, aPos, aRadius, aColor ) :
     '''Draw a hollow circle with the given radius and color with aPos as center.'''
-    self.colorData[0] = aColor >> 8
-    self.colorData[1] = aColor
-    xend = int(0.7071 * aRadius) + 1
-    rsq = aRadius * aRadius
-    for x in range(xend) :
-      y = int(sqrt(rsq - x * x))
-      xp = aPos[0] + x
-      yp = aPos[1] + y
-      xn = aPos[0] - x
-      yn = aPos[1] - y
-      xyp = aPos[0] + y
-      yxp = aPos[1] + x
-      xyn = aPos[0] - y
-      yxn = aPos[1] - x
-
-      self._setwindowpoint((xp, yp))
-      self._writedata(self.colorData)
-      self._setwindowpoint((xp, yn))
-      self._writedata(self.colorData)
-      self._setwindowpoint((xn, yp))
-      self._writedata(self.colorData)
-      self._setwindowpoint((xn, yn))
-      self._writedata(self.colorData)
-      self._setwindowpoint((xyp, yxp))
-      self._writedata(self.colorData)
-      self._setwindowpoint((xyp, yxn))
-      self._writedata(self.colorData)
-      self._setwindowpoint((xyn, yxp))
-      self._writedata(self.colorData)
-      self._setwindowpoint((xyn, yxn))
-      self._writedata(self.colorData)
+    #Each octant covers x up to 0.7071 * aRadius.
+    end = (7071 * aRadius) // 10000 + 1
+    self._arcs(aPos[0], aPos[1], aRadius, aRadius, end, False, aColor)
+    self._arcs(aPos[0], aPos[1], aRadius, aRadius, end, True, aColor)
 
 #   @micropython.native
   def fillcircle( self, aPos, aRadius, aColor ) :
     '''Draw a filled circle with given radius and color with aPos as center'''
-    rsq = aRadius * aRadius
-    for x in range(aRadius) :
-      y = int(sqrt(rsq - x * x))
-      y0 = aPos[1] - y
-      ey = y0 + y * 2
-      y0 = clamp(y0, 0, self._size[1])
-      ln = abs(ey - y0) + 1
+    self._spans(aPos[0], aPos[1], aRadius, aRadius, aRadius - 1, aColor)
 
-      self.vline((aPos[0] + x, y0), ln, aColor)
-      self.vline((aPos[0] - x, y0), ln, aColor)
+#   @micropython.native
+  def ellipse( self, aPos, aRadii, aColor ) :
+    '''Draw a hollow ellipse with the given x, y radii and color with aPos
+       as center.'''
+    rx, ry = aRadii
+    #The flat part of each quadrant ends where the slope is 1.
+    rr = rx * rx + ry * ry
+    xend = 1
+    while xend <= rx and (xend * xend) * rr <= rx ** 4:
+      xend += 1
+    yend = 1
+    while yend <= ry and (yend * yend) * rr <= ry ** 4:
+      yend += 1
+    self._arcs(aPos[0], aPos[1], rx, ry, xend, False, aColor)
+    self._arcs(aPos[0], aPos[1], ry, rx, yend, True, aColor)
+
+#   @micropython.native
+  def fillellipse( self, aPos, aRadii, aColor ) :
+    '''Draw a filled ellipse with the given x, y radii and color with aPos
+       as center.'''
+    self._spans(aPos[0], aPos[1], aRadii[0], aRadii[1], aRadii[0], aColor)
+
+#   @micropython.native
+  def _arcs( self, cx, cy, a, b, end, vertical, aColor ) :
+    '''Draw the outline points (x, y) of the ellipse with radii a, b for
+       x from 0 to end - 1 in all quadrants, y is the largest value with
+       x * x * b * b + y * y * a * a <= a * a * b * b. Points with the same y
+       are drawn as one run. vertical swaps x and y.'''
+    aa = a * a
+    bb = b * b
+    limit = aa * bb
+    y = b
+    x0 = 0
+    for x in range(end + 1):
+      if x < end:
+        #Midpoint walk, y only decreases while x increases.
+        ny = y
+        while ny > 0 and x * x * bb + ny * ny * aa > limit:
+          ny -= 1
+        if ny == y or x == 0:
+          y = ny
+          continue
+      #Run x0 to x - 1 at y is complete.
+      x1 = x - 1
+      if vertical:
+        self._run(cx + y, cy, x0, x1, True, aColor)
+        self._run(cx - y, cy, x0, x1, True, aColor)
+      else:
+        self._run(cx, cy + y, x0, x1, False, aColor)
+        self._run(cx, cy - y, x0, x1, False, aColor)
+      if x < end:
+        y = ny
+        x0 = x
+
+#   @micropython.native
+  def _run( self, x, y, d0, d1, vertical, aColor ) :
+    '''Draw the mirrored runs d0 to d1 pixels away from x (or from y if
+       vertical). The runs are joined if d0 is 0.'''
+    if vertical:
+      if d0 == 0:
+        self._rect(x, y - d1, x, y + d1, aColor)
+      else:
+        self._rect(x, y + d0, x, y + d1, aColor)
+        self._rect(x, y - d1, x, y - d0, aColor)
+    elif d0 == 0:
+      self._rect(x - d1, y, x + d1, y, aColor)
+    else:
+      self._rect(x + d0, y, x + d1, y, aColor)
+      self._rect(x - d1, y, x - d0, y, aColor)
+
+#   @micropython.native
+  def _spans( self, cx, cy, a, b, limit, aColor ) :
+    '''Fill the ellipse with radii a, b as horizontal spans, the half width
+       of a span is the largest x with x * x * b * b + dy * dy * a * a <=
+       a * a * b * b, at most limit. Rows with the same span are drawn as one
+       rectangle.'''
+    aa = a * a
+    bb = b * b
+    total = aa * bb
+    x = a
+    half = min(x, limit)
+    d0 = 0
+    for dy in range(1, b + 2):
+      if dy <= b:
+        #Midpoint walk, x only decreases while dy increases.
+        while x >= 0 and x * x * bb + dy * dy * aa > total:
+          x -= 1
+        if min(x, limit) == half:
+          continue
+      #Rows d0 to dy - 1 have the same span.
+      if half >= 0:
+        d1 = dy - 1
+        if d0 == 0:
+          self._rect(cx - half, cy - d1, cx + half, cy + d1, aColor)
+        else:
+          self._rect(cx - half, cy + d0, cx + half, cy + d1, aColor)
+          self._rect(cx - half, cy - d1, cx + half, cy - d0, aColor)
+      half = min(x, limit)
+      d0 = dy
+
+#   @micropython.native
+  def _rect( self, x0, y0, x1, y1, aColor ) :
+    '''Fill the rectangle x0, y0 to x1, y1 clipped to the screen.'''
+    if x0 < 0:
+      x0 = 0
+    if y0 < 0:
+      y0 = 0
+    if x1 >= self._size[0]:
+      x1 = self._size[0] - 1
+    if y1 >= self._size[1]:
+      y1 = self._size[1] - 1
+    if x0 > x1 or y0 > y1:
+      return
+    self._setwindow(x0, y0, x1, y1)
+    self._setColor(aColor)
+    self._draw((x1 - x0 + 1) * (y1 - y0 + 1))
 
   def fill( self, aColor = TFT.BLACK ) :
     '''Fill screen with the given color.'''
-    self.fill_rect((0, 0), self._size, aColor)
+    self.fill_rect_xywh(0, 0, self._size[0], self._size[1], aColor)
 
   def clear( self ) :
       '''Clear screen'''
@@ -429,73 +725,143 @@ class ST7735(object) :
     data2 = bytearray([addr >> 8, addr & 0xff])
     self._writedata(data2)
     
+  def set_fill_cache( self, size, chunk=None ) :
+    '''Set the byte budget of the fill chunk cache and clear the cache.
+       The cache holds chunks of fill_chunk pixels for the most recently used
+       fill colors, the least recently used chunk is reused for a new color.
+       At least one chunk is kept, even if it is larger than size, so a
+       repeated fill never allocates. chunk changes the pixels per chunk.'''
+    if chunk is not None:
+      self._fill_chunk = chunk
+    self._fill_slots = max(1, size // (self._fill_chunk * 2))
+    self._fill_cache = {}
+    self._fill_keys = []
+    self._tails = {}
+    self.fill_hits = 0
+    self.fill_misses = 0
+
 #   @micropython.native
   def _setColor( self, aColor ) :
+    '''Select the fill chunk of the given color for _draw.'''
     self.colorData[0] = aColor >> 8
-    self.colorData[1] = aColor
-    self.buf = bytes(self.colorData) * 32
+    self.colorData[1] = aColor & 0xFF
+    keys = self._fill_keys
+    entry = self._fill_cache.get(aColor)
+    if entry is not None:
+      self.fill_hits += 1
+      if keys[-1] != aColor:
+        keys.remove(aColor)
+        keys.append(aColor)
+      self.buf, self._tails = entry
+      return
+
+    self.fill_misses += 1
+    if keys and len(keys) >= self._fill_slots:
+      #The tail views of the reused chunk stay valid.
+      entry = self._fill_cache.pop(keys.pop(0))
+      buf = entry[0]
+    else:
+      buf = memoryview(bytearray(self._fill_chunk * 2))
+      entry = (buf, {})
+    buf[0] = self.colorData[0]
+    buf[1] = self.colorData[1]
+    #expand the first pixel by doubling
+    size = 2
+    total = len(buf)
+    while size < total:
+      count = min(size, total - size)
+      buf[size:size + count] = buf[:count]
+      size += count
+    self._fill_cache[aColor] = entry
+    keys.append(aColor)
+    self.buf, self._tails = entry
 
 #   @micropython.native
   def _draw( self, aPixels ) :
     '''Send given color to the device aPixels times.'''
-
+    buf = self.buf
+    size = len(buf) >> 1
+    rest = int(aPixels) % size
     self.dc(1)
     self.cs(0)
-    for i in range(aPixels//32):
-      self.spi.write(self.buf)
-    rest = (int(aPixels) % 32)
+    for i in range(int(aPixels) // size):
+      self.spi.write(buf)
     if rest > 0:
-        buf2 = bytes(self.colorData) * rest
-        self.spi.write(buf2)
+      #Views of the chunk are kept per length, a repeated fill does not
+      # allocate.
+      tail = self._tails.get(rest)
+      if tail is None:
+        tail = buf[:rest * 2]
+        if len(self._tails) < _FILL_TAILS:
+          self._tails[rest] = tail
+      self.spi.write(tail)
     self.cs(1)
 
 #   @micropython.native
   def _setwindowpoint( self, aPos ) :
     '''Set a single point for drawing a color to.'''
-    x = self._offset[0] + int(aPos[0])
-    y = self._offset[1] + int(aPos[1])
-    self._writecommand(self.CASET)            #Column address set.
-    self.windowLocData[0] = self._offset[0]
-    self.windowLocData[1] = x
-    self.windowLocData[2] = self._offset[0]
-    self.windowLocData[3] = x
-    self._writedata(self.windowLocData)
-
-    self._writecommand(self.RASET)            #Row address set.
-    self.windowLocData[0] = self._offset[1]
-    self.windowLocData[1] = y
-    self.windowLocData[2] = self._offset[1]
-    self.windowLocData[3] = y
-    self._writedata(self.windowLocData)
-    self._writecommand(self.RAMWR)            #Write to RAM.
+    x = int(aPos[0])
+    y = int(aPos[1])
+    self._setwindow(x, y, x, y)
 
 #   @micropython.native
   def _setwindowloc( self, aPos0, aPos1 ) :
     '''Set a rectangular area for drawing a color to.'''
-    self._writecommand(self.CASET)            #Column address set.
-    self.windowLocData[0] = self._offset[0]
-    self.windowLocData[1] = self._offset[0] + int(aPos0[0])
-    self.windowLocData[2] = self._offset[0]
-    self.windowLocData[3] = self._offset[0] + int(aPos1[0])
-    self._writedata(self.windowLocData)
-
-    self._writecommand(self.RASET)            #Row address set.
-    self.windowLocData[0] = self._offset[1]
-    self.windowLocData[1] = self._offset[1] + int(aPos0[1])
-    self.windowLocData[2] = self._offset[1]
-    self.windowLocData[3] = self._offset[1] + int(aPos1[1])
-    self._writedata(self.windowLocData)
+    self._setwindow(int(aPos0[0]), int(aPos0[1]), int(aPos1[0]), int(aPos1[1]))
 
-    self._writecommand(self.RAMWR)            #Write to RAM.
+#   @micropython.native
+  def _setwindow( self, x0, y0, x1, y1 ) :
+    '''Set the rectangular area x0, y0 to x1, y1 for drawing a color to. The
+       commands are sent with a single CS assertion, CASET or RASET is skipped
+       if the column or row range did not change since the last window.'''
+    spi = self.spi
+    dc = self.dc
+    data = self.windowLocData
+    self.cs(0)
+    if x0 != self._winx0 or x1 != self._winx1:
+      data[0] = self._offset[0]
+      data[1] = self._offset[0] + x0
+      data[2] = self._offset[0]
+      data[3] = self._offset[0] + x1
+      dc(0)
+      spi.write(_CASET)                         #Column address set.
+      dc(1)
+      spi.write(data)
+      self._winx0 = x0
+      self._winx1 = x1
+    if y0 != self._winy0 or y1 != self._winy1:
+      data[0] = self._offset[1]
+      data[1] = self._offset[1] + y0
+      data[2] = self._offset[1]
+      data[3] = self._offset[1] + y1
+      dc(0)
+      spi.write(_RASET)                         #Row address set.
+      dc(1)
+      spi.write(data)
+      self._winy0 = y0
+      self._winy1 = y1
+    dc(0)
+    spi.write(_RAMWR)                           #Write to RAM.
+    self.cs(1)
 
   #@micropython.native
   def _writecommand( self, aCommand ) :
     '''Write given command to the device.'''
+    if aCommand == self.CASET or aCommand == self.RASET or aCommand == self.SWRESET:
+      self._invalidate()
+    self._command[0] = aCommand
     self.dc(0)
     self.cs(0)
-    self.spi.write(bytearray([aCommand]))
+    self.spi.write(self._command)
     self.cs(1)
 
+  def _invalidate( self ) :
+    '''Forget the range of the last window, the next window sets both.'''
+    self._winx0 = -1
+    self._winx1 = -1
+    self._winy0 = -1
+    self._winy1 = -1
+
   #@micropython.native
   def _writedata( self, aData ) :
     '''Write given data to the device.  This may be
@@ -509,12 +875,13 @@ class ST7735(object) :
   def _pushcolor( self, aColor ) :
     '''Push given color to the device.'''
     self.colorData[0] = aColor >> 8
-    self.colorData[1] = aColor
+    self.colorData[1] = aColor & 0xFF
     self._writedata(self.colorData)
 
   #@micropython.native
   def _setMADCTL( self ) :
     '''Set screen rotation and RGB/BGR format.'''
+    self._invalidate()
     self._writecommand(self.MADCTL)
     rgb = TFTRGB if self._rgb else TFTBGR
     self._writedata(bytearray([TFTRotations[self.rotate] | rgb]))
@@ -522,6 +889,7 @@ class ST7735(object) :
   #@micropython.native
   def _reset( self ) :
     '''Reset the device.'''
+    self._invalidate()
     self.dc(0)
     self.reset(1)
     time.sleep_us(500)
@@ -36,7 +36,7 @@ This driver supports:
   multiples of 8.  Included are 12 bitmap fonts derived from classic pc
   BIOS text mode fonts.
 - Drawing text using converted TrueType fonts.
-- Drawing converted bitmaps
+- Drawing converted bitmaps and bitmaps streamed from binary files
 
 GKR 14.12.25
 moved color functions(s) and constants to tftcolor.py
@@ -47,6 +47,7 @@ added clear()
 from micropython import const
 from math import sin, cos
 from time import sleep_ms
+from array import array
 import struct
 
 # ST7789 commands
@@ -115,6 +116,16 @@ _ENCODE_POS_16 = const("<HH")
 # must be at least 256 for 16 bit wide fonts
 _BUFFER_SIZE = const(256)
 
+# default byte budget of the fill buffer cache (_BUFFER_SIZE pixels per color)
+_FILL_CACHE_SIZE = const(2048)
+
+# default byte budget of the glyph cache (width * height * 2 bytes per glyph)
+_GLYPH_CACHE_SIZE = const(8192)
+
+# default size of the text line buffer, characters of a text row are sent
+# with a single window write as long as they fit
+_TEXT_BUFFER_SIZE = const(8192)
+
 _BIT7 = const(0x80)
 _BIT6 = const(0x40)
 _BIT5 = const(0x20)
@@ -230,6 +241,13 @@ class ST7789:
 
           - ((width, height, xstart, ystart, madctl, needs_swap), ...)
 
+        fill_cache (int): byte budget of the fill buffer cache, 0 disables
+          the cache
+        glyph_cache (int): byte budget of the glyph cache, 0 disables the
+          cache
+        text_buffer (int): size of the text line buffer, allocated on first
+          use, 0 sends each character separately
+
     """
 
     def __init__(
@@ -245,6 +263,9 @@ class ST7789:
         color_order=BGR,
         custom_init=None,
         custom_rotations=None,
+        fill_cache=_FILL_CACHE_SIZE,
+        glyph_cache=_GLYPH_CACHE_SIZE,
+        text_buffer=_TEXT_BUFFER_SIZE,
     ):
         """
         Initialize display.
@@ -273,6 +294,21 @@ class ST7789:
         self._rotation = rotation % 4
         self.color_order = color_order
         self.init_cmds = custom_init or _ST7789_INIT_CMDS
+        # transaction depth, preallocated window and pixel buffers
+        self._depth = 0
+        self._window = bytearray(4)
+        self._pixel = bytearray(2)
+        self.set_fill_cache(fill_cache)
+        self._colors = array('H', [0, 0])
+        # viper parameters, see _place() and _unpack()
+        self._params = array('H', [0] * 6)
+        self.set_glyph_cache(glyph_cache)
+        self._text_size = text_buffer
+        self._text_buffer = None
+        # glyph index of each converted true-type font, see _font_index()
+        self._fonts = {}
+        # palette, bpp, byte order and lookup table of the last bitmap
+        self._lut = None
         self.hard_reset()
         # yes, twice, once is not always enough
         self.init(self.init_cmds)
@@ -300,9 +336,26 @@ class ST7789:
             self._write(command, data)
             sleep_ms(delay)
 
+    def begin(self):
+        """
+        Start a transaction. CS stays asserted until the matching end(),
+        transactions may be nested.
+        """
+        if self._depth == 0 and self.cs:
+            self.cs.off()
+        self._depth += 1
+
+    def end(self):
+        """
+        End a transaction, release CS at the end of the outermost transaction.
+        """
+        self._depth -= 1
+        if self._depth == 0 and self.cs:
+            self.cs.on()
+
     def _write(self, command=None, data=None):
         """SPI write to the device: commands and data."""
-        if self.cs:
+        if self.cs and not self._depth:
             self.cs.off()
         if command is not None:
             self.dc.off()
@@ -310,7 +363,7 @@ class ST7789:
         if data is not None:
             self.dc.on()
             self.spi.write(data)
-            if self.cs:
+            if self.cs and not self._depth:
                 self.cs.on()
 
     def hard_reset(self):
@@ -406,15 +459,24 @@ class ST7789:
             y1 (int): row end address
         """
         if x0 <= x1 <= self.width and y0 <= y1 <= self.height:
-            self._write(
-                _ST7789_CASET,
-                struct.pack(_ENCODE_POS, x0 + self.xstart, x1 + self.xstart),
-            )
-            self._write(
-                _ST7789_RASET,
-                struct.pack(_ENCODE_POS, y0 + self.ystart, y1 + self.ystart),
-            )
-            self._write(_ST7789_RAMWR)
+            spi = self.spi
+            dc = self.dc
+            window = self._window
+            self.begin()
+            struct.pack_into(_ENCODE_POS, window, 0, x0 + self.xstart, x1 + self.xstart)
+            dc.off()
+            spi.write(_ST7789_CASET)
+            dc.on()
+            spi.write(window)
+            struct.pack_into(_ENCODE_POS, window, 0, y0 + self.ystart, y1 + self.ystart)
+            dc.off()
+            spi.write(_ST7789_RASET)
+            dc.on()
+            spi.write(window)
+            dc.off()
+            spi.write(_ST7789_RAMWR)
+            dc.on()
+            self.end()
 
     def vline(self, x, y, length, color):
         """
@@ -449,13 +511,15 @@ class ST7789:
             Y (int): y coordinate
             color (int): 565 encoded color
         """
-        self._set_window(x, y, x, y)
-        self._write(
-            None,
-            struct.pack(
-                _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL, color
-            ),
+        struct.pack_into(
+            _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL, self._pixel, 0, color
         )
+        self.begin()
+        try:
+            self._set_window(x, y, x, y)
+            self.spi.write(self._pixel)
+        finally:
+            self.end()
 
     def blit_buffer(self, buffer, x, y, width, height):
         """
@@ -468,8 +532,12 @@ class ST7789:
             width (int): Width
             height (int): Height
         """
-        self._set_window(x, y, x + width - 1, y + height - 1)
-        self._write(None, buffer)
+        self.begin()
+        try:
+            self._set_window(x, y, x + width - 1, y + height - 1)
+            self.spi.write(buffer)
+        finally:
+            self.end()
 
     def rect(self, x, y, w, h, color):
         """
@@ -487,6 +555,62 @@ class ST7789:
         self.vline(x + w - 1, y, h, color)
         self.hline(x, y + h - 1, w, color)
 
+    def set_fill_cache(self, size):
+        """
+        Set the byte budget of the fill buffer cache and clear the cache.
+
+        The cache holds pre-expanded buffers of _BUFFER_SIZE pixels for the
+        most recently used fill colors. The least recently used buffer is
+        reused for a new color, so fill_rect() does not allocate once the
+        cache is full.
+
+        Args:
+            size (int): byte budget, 0 disables the cache
+        """
+        self._fill_slots = size // (_BUFFER_SIZE * 2)
+        self._fill_cache = {}
+        self._fill_keys = []
+        self.fill_hits = 0
+        self.fill_misses = 0
+
+    def _fill_buffer(self, color):
+        """
+        Return a memoryview of _BUFFER_SIZE pixels of color in display byte
+        order.
+
+        Args:
+            color (int): 565 encoded color
+        """
+        key = color | 0x10000 if self.needs_swap else color
+        keys = self._fill_keys
+        data = self._fill_cache.get(key)
+        if data is not None:
+            self.fill_hits += 1
+            if keys[-1] != key:
+                keys.remove(key)
+                keys.append(key)
+            return data
+
+        self.fill_misses += 1
+        if keys and len(keys) >= self._fill_slots:
+            data = self._fill_cache.pop(keys.pop(0))
+        else:
+            data = memoryview(bytearray(_BUFFER_SIZE * 2))
+        struct.pack_into(
+            _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL, data, 0, color
+        )
+        # expand the first pixel by doubling
+        size = 2
+        total = len(data)
+        while size < total:
+            count = min(size, total - size)
+            data[size:size + count] = data[:count]
+            size += count
+        if self._fill_slots:
+            self._fill_cache[key] = data
+            keys.append(key)
+        return data
+
     def fill_rect(self, x, y, width, height, color):
         """
         Draw a rectangle at the given location, size and filled with color.
@@ -498,18 +622,18 @@ class ST7789:
             height (int): Height in pixels
             color (int): 565 encoded color
         """
-        self._set_window(x, y, x + width - 1, y + height - 1)
         chunks, rest = divmod(width * height, _BUFFER_SIZE)
-        pixel = struct.pack(
-            _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL, color
-        )
-        self.dc.on()
-        if chunks:
-            data = pixel * _BUFFER_SIZE
+        data = self._fill_buffer(color)
+        spi = self.spi
+        self.begin()
+        try:
+            self._set_window(x, y, x + width - 1, y + height - 1)
             for _ in range(chunks):
-                self._write(None, data)
-        if rest:
-            self._write(None, pixel * rest)
+                spi.write(data)
+            if rest:
+                spi.write(data[:rest * 2])
+        finally:
+            self.end()
 
     def fill(self, color):
         """
@@ -526,6 +650,8 @@ class ST7789:
     def line(self, x0, y0, x1, y1, color):
         """
         Draw a single pixel wide line starting at x0, y0 and ending at x1, y1.
+        The horizontal (or vertical for steep lines) runs of the line are
+        sent as single window writes.
 
         Args:
             x0 (int): Start point x coordinate
@@ -545,16 +671,23 @@ class ST7789:
         dy = abs(y1 - y0)
         err = dx // 2
         ystep = 1 if y0 < y1 else -1
-        while x0 <= x1:
-            if steep:
-                self.pixel(y0, x0, color)
-            else:
-                self.pixel(x0, y0, color)
-            err -= dy
-            if err < 0:
-                y0 += ystep
-                err += dx
-            x0 += 1
+        run = x0
+        self.begin()
+        try:
+            while x0 <= x1:
+                err -= dy
+                if err < 0 or x0 == x1:
+                    if steep:
+                        self.fill_rect(y0, run, 1, x0 - run + 1, color)
+                    else:
+                        self.fill_rect(run, y0, x0 - run + 1, 1, color)
+                    run = x0 + 1
+                    if err < 0:
+                        y0 += ystep
+                        err += dx
+                x0 += 1
+        finally:
+            self.end()
 
     def vscrdef(self, tfa, vsa, bfa):
         """
@@ -594,12 +727,24 @@ class ST7789:
 
     @micropython.viper
     @staticmethod
-    def _pack8(glyphs, idx: uint, fg_color: uint, bg_color: uint):
-        buffer = bytearray(128)
+    def _pack8(glyphs, idx: uint, colors, buffer):
+        """
+        Pack the rows of an 8 pixel wide character into a buffer.
+
+        Args:
+            glyphs (bytes): font bitmap
+            idx (int): index of the first row of the character
+            colors (array): foreground and background color in display byte order
+            buffer (bytearray): color565 buffer, len(buffer) // 16 rows
+        """
+        color = ptr16(colors)
+        fg_color = color[0]
+        bg_color = color[1]
         bitmap = ptr16(buffer)
         glyph = ptr8(glyphs)
+        pixels = int(len(buffer)) >> 1
 
-        for i in range(0, 64, 8):
+        for i in range(0, pixels, 8):
             byte = glyph[idx]
             bitmap[i] = fg_color if byte & _BIT7 else bg_color
             bitmap[i + 1] = fg_color if byte & _BIT6 else bg_color
@@ -611,26 +756,26 @@ class ST7789:
             bitmap[i + 7] = fg_color if byte & _BIT0 else bg_color
             idx += 1
 
-        return buffer
-
     @micropython.viper
     @staticmethod
-    def _pack16(glyphs, idx: uint, fg_color: uint, bg_color: uint):
+    def _pack16(glyphs, idx: uint, colors, buffer):
         """
-        Pack a character into a byte array.
+        Pack the rows of a 16 pixel wide character into a buffer.
 
         Args:
-            char (str): character to pack
-
-        Returns:
-            128 bytes: character bitmap in color565 format
+            glyphs (bytes): font bitmap
+            idx (int): index of the first row of the character
+            colors (array): foreground and background color in display byte order
+            buffer (bytearray): color565 buffer, len(buffer) // 32 rows
         """
-
-        buffer = bytearray(256)
+        color = ptr16(colors)
+        fg_color = color[0]
+        bg_color = color[1]
         bitmap = ptr16(buffer)
         glyph = ptr8(glyphs)
+        pixels = int(len(buffer)) >> 1
 
-        for i in range(0, 128, 16):
+        for i in range(0, pixels, 16):
             byte = glyph[idx]
 
             bitmap[i] = fg_color if byte & _BIT7 else bg_color
@@ -654,46 +799,229 @@ class ST7789:
             bitmap[i + 15] = fg_color if byte & _BIT0 else bg_color
             idx += 1
 
+    def set_glyph_cache(self, size):
+        """
+        Set the byte budget of the glyph cache and clear the cache.
+
+        The cache holds packed color565 character bitmaps keyed by font,
+        character, foreground and background color. The least recently used
+        glyphs are dropped when the budget is exceeded, their buffers are
+        reused for new glyphs of the same size.
+
+        Args:
+            size (int): byte budget, 0 disables the cache
+        """
+        self._glyph_budget = size
+        self._glyph_cache = {}
+        self._glyph_keys = []
+        self.glyph_bytes = 0
+        self.glyph_hits = 0
+        self.glyph_misses = 0
+
+    def cache_stats(self):
+        """
+        Return the fill and glyph cache statistics.
+
+        Returns:
+            dict: hits, misses and entries of each cache, glyph cache bytes
+        """
+        return {
+            'fill_hits': self.fill_hits,
+            'fill_misses': self.fill_misses,
+            'fill_entries': len(self._fill_keys),
+            'glyph_hits': self.glyph_hits,
+            'glyph_misses': self.glyph_misses,
+            'glyph_entries': len(self._glyph_keys),
+            'glyph_bytes': self.glyph_bytes,
+        }
+
+    def _glyph(self, font, ch, fg_color, bg_color):
+        """
+        Return the packed color565 bitmap of a character, rows top to bottom.
+
+        Args:
+            font (module): font module to use
+            ch (int): character code, font.FIRST <= ch < font.LAST
+            fg_color (int): foreground color in display byte order
+            bg_color (int): background color in display byte order
+        """
+        key = (font, ch, fg_color, bg_color)
+        keys = self._glyph_keys
+        cache = self._glyph_cache
+        buffer = cache.get(key)
+        if buffer is not None:
+            self.glyph_hits += 1
+            if keys[-1] != key:
+                keys.remove(key)
+                keys.append(key)
+            return buffer
+
+        self.glyph_misses += 1
+        size = font.WIDTH * font.HEIGHT * 2
+        cached = size <= self._glyph_budget
+        buffer = None
+        while cached and self.glyph_bytes + size > self._glyph_budget:
+            old = cache.pop(keys.pop(0))
+            self.glyph_bytes -= len(old)
+            if len(old) == size:
+                buffer = old
+        if buffer is None:
+            buffer = bytearray(size)
+
+        colors = self._colors
+        colors[0] = fg_color
+        colors[1] = bg_color
+        idx = (ch - font.FIRST) * size // 16
+        if font.WIDTH == 8:
+            self._pack8(font.FONT, idx, colors, buffer)
+        else:
+            self._pack16(font.FONT, idx, colors, buffer)
+        if cached:
+            cache[key] = buffer
+            keys.append(key)
+            self.glyph_bytes += size
         return buffer
 
-    def _text8(self, font, text, x0, y0, fg_color=WHITE, bg_color=BLACK, nowrap=False):
+    @micropython.viper
+    @staticmethod
+    def _place(glyph, line, params):
         """
-        Internal method to write characters with width of 8 and
-        heights of 8 or 16.
+        Copy a packed character into a text line buffer.
+
+        Args:
+            glyph (bytearray): packed character, rows top to bottom
+            line (bytearray): line buffer
+            params (array): first column of the character in the line,
+              line width, character width and rows
+        """
+        param = ptr16(params)
+        col = param[0]
+        stride = param[1]
+        width = param[2]
+        rows = param[3]
+        src = ptr16(glyph)
+        dst = ptr16(line)
+        s = 0
+        d = col
+        for _ in range(rows):
+            for c in range(width):
+                dst[d + c] = src[s + c]
+            s += width
+            d += stride
+
+    def _line_buffer(self):
+        """
+        Return the text line buffer, None if disabled. The buffer is
+        allocated on first use.
+        """
+        if self._text_buffer is None and self._text_size > 0:
+            self._text_buffer = memoryview(bytearray(self._text_size))
+        return self._text_buffer
+
+    def _text_run(self, run, x0, y0, width, height):
+        """
+        Internal method to send a run of packed characters on one text row
+        with a single window write. Rows below the display are clipped in
+        bands of 8 rows.
+
+        Args:
+            run (list): packed characters
+            x0 (int): column of the first character
+            y0 (int): row of the characters
+            width (int): character width
+            height (int): character height
+        """
+        count = len(run)
+        if count == 0:
+            return
+        rows = min(height, (self.height - y0 + 1) // 8 * 8)
+        if rows <= 0:
+            return
+        if count == 1:
+            data = run[0]
+            if rows < height:
+                data = memoryview(data)[:width * rows * 2]
+            self.blit_buffer(data, x0, y0, width, rows)
+            return
+
+        stride = count * width
+        line = self._text_buffer[:stride * height * 2]
+        params = self._params
+        params[1] = stride
+        params[2] = width
+        params[3] = height
+        for i in range(count):
+            params[0] = i * width
+            self._place(run[i], line, params)
+        self.blit_buffer(line[:stride * rows * 2], x0, y0, stride, rows)
+
+    def _text(self, font, text, x0, y0, fg_color, bg_color, nowrap, skip):
+        """
+        Internal method to draw characters, all characters of a text row are
+        packed into the line buffer and sent with a single window write.
 
         Args:
             font (module): font module to use
             text (str): text to write
             x0 (int): column to start drawing at
             y0 (int): row to start drawing at
-            color (int): 565 encoded color to use for characters
-            background (int): 565 encoded color to use for background
+            fg_color (int): color to use for characters in display byte order
+            background (int): color to use for background in display byte order
+            nowrap (bool): stop at the end of the row instead of wrapping
+            skip (bool): advance the column for characters not in the font
         """
+        width = font.WIDTH
+        height = font.HEIGHT
+        size = width * height * 2
+        line = self._line_buffer()
+        limit = len(line) // size if line is not None else 1
+        # a pending run holds cached glyphs, it must not be longer than the
+        # cache, a miss would evict and reuse a glyph of the run
+        slots = self._glyph_budget // size
+        if slots > 0:
+            limit = min(limit, slots)
+
         xstart = x0
+        run = []
+        run_x = x0
         for char in text:
             ch = ord(char)
             if font.FIRST <= ch < font.LAST:
-                if x0 + font.WIDTH >= self.width:
+                if x0 + width >= self.width:
                     if nowrap:
                         break
                     else:
-                        y0 = y0 + font.HEIGHT + 1
+                        self._text_run(run, run_x, y0, width, height)
+                        run = []
+                        y0 = y0 + height + 1
                         x0 = xstart
-                if font.HEIGHT == 8:
-                    passes = 1
-                    size = 8
-                    each = 0
-                else:
-                    passes = 2
-                    size = 16
-                    each = 8
+                if len(run) >= limit:
+                    self._text_run(run, run_x, y0, width, height)
+                    run = []
+                if not run:
+                    run_x = x0
+                run.append(self._glyph(font, ch, fg_color, bg_color))
+                x0 += width
+            elif skip:
+                self._text_run(run, run_x, y0, width, height)
+                run = []
+                x0 += width
+        self._text_run(run, run_x, y0, width, height)
 
-                for line in range(passes):
-                    idx = (ch - font.FIRST) * size + (each * line)
-                    buffer = self._pack8(font.FONT, idx, fg_color, bg_color)
-                    self.blit_buffer(buffer, x0, y0 + 8 * line, 8, 8)
+    def _text8(self, font, text, x0, y0, fg_color=WHITE, bg_color=BLACK, nowrap=False):
+        """
+        Internal method to write characters with width of 8 and
+        heights of 8 or 16.
 
-                x0 += 8
+        Args:
+            font (module): font module to use
+            text (str): text to write
+            x0 (int): column to start drawing at
+            y0 (int): row to start drawing at
+            color (int): 565 encoded color to use for characters
+            background (int): 565 encoded color to use for background
+        """
+        self._text(font, text, x0, y0, fg_color, bg_color, nowrap, False)
 
     def _text16(self, font, text, x0, y0, fg_color=WHITE, bg_color=BLACK, nowrap=False):
         """
@@ -708,29 +1036,7 @@ class ST7789:
             color (int): 565 encoded color to use for characters
             background (int): 565 encoded color to use for background
         """
-        xstart = x0
-        for char in text:
-            ch = ord(char)
-            if font.FIRST <= ch < font.LAST:
-                if x0 + font.WIDTH >= self.width:
-                    if nowrap:
-                        break
-                    else:
-                        y0 = y0 + font.HEIGHT + 1
-                        x0 = xstart
-                each = 16
-                if font.HEIGHT == 16:
-                    passes = 2
-                    size = 32
-                else:
-                    passes = 4
-                    size = 64
-
-                for line in range(passes):
-                    idx = (ch - font.FIRST) * size + (each * line)
-                    buffer = self._pack16(font.FONT, idx, fg_color, bg_color)
-                    self.blit_buffer(buffer, x0, y0 + 8 * line, 16, 8)
-            x0 += 16
+        self._text(font, text, x0, y0, fg_color, bg_color, nowrap, True)
 
     def text(self, font, text, x0, y0, color=WHITE, background=BLACK, nowrap=False):
         """
@@ -752,10 +1058,174 @@ class ST7789:
             else ((background << 8) & 0xFF00) | (background >> 8)
         )
 
-        if font.WIDTH == 8:
-            self._text8(font, text, x0, y0, fg_color, bg_color, nowrap)
-        else:
-            self._text16(font, text, x0, y0, fg_color, bg_color, nowrap)
+        self.begin()
+        try:
+            if font.WIDTH == 8:
+                self._text8(font, text, x0, y0, fg_color, bg_color, nowrap)
+            else:
+                self._text16(font, text, x0, y0, fg_color, bg_color, nowrap)
+        finally:
+            self.end()
+
+    def _bitmap_lut(self, palette, bpp):
+        """
+        Return the color lookup table of a palette in display byte order, the
+        table of the last bitmap drawn is reused.
+
+        Args:
+            palette (list): 565 encoded colors
+            bpp (int): bits per pixel
+
+        Returns:
+            array: color565 values of the 8 // bpp pixels of each byte value
+            if bpp is 1, 2, 4 or 8, else the color565 value of each palette
+            index
+        """
+        lut = self._lut
+        if lut is not None and lut[0] is palette and lut[1] == bpp and lut[2] == self.needs_swap:
+            return lut[3]
+
+        colors = array('H', [0] * (1 << bpp))
+        for i in range(min(len(palette), len(colors))):
+            color = palette[i]
+            colors[i] = color if self.needs_swap else ((color << 8) & 0xFF00) | (color >> 8)
+        table = colors
+        if 8 % bpp == 0:
+            per_byte = 8 // bpp
+            mask = (1 << bpp) - 1
+            table = array('H', [0] * (256 * per_byte))
+            for byte in range(256):
+                for i in range(per_byte):
+                    table[byte * per_byte + i] = colors[(byte >> (8 - bpp * (i + 1))) & mask]
+        self._lut = (palette, bpp, self.needs_swap, table)
+        return table
+
+    @micropython.viper
+    @staticmethod
+    def _expand(data, lut, buffer, params):
+        """
+        Expand the pixels of a 1, 2, 4 or 8 bit per pixel bitmap a byte at a
+        time through a lookup table. The buffer may overlap the end of the
+        data, data bytes are read before their pixels are written.
+
+        Args:
+            data (bytes): bitmap data, pixels bit packed
+            lut (array): color565 values of the pixels of each byte value
+            buffer (bytearray): color565 buffer
+            params (array): pixels of the first byte to skip, pixels per
+              byte and pixels to expand
+        """
+        param = ptr16(params)
+        skip = param[0]
+        per_byte = param[1]
+        pixels = param[2]
+        src = ptr8(data)
+        table = ptr16(lut)
+        dst = ptr16(buffer)
+        s = 0
+        d = 0
+        while d < pixels:
+            t = src[s] * per_byte
+            i = skip
+            while i < per_byte and d < pixels:
+                dst[d] = table[t + i]
+                d += 1
+                i += 1
+            skip = 0
+            s += 1
+
+    @micropython.viper
+    @staticmethod
+    def _expand_bits(data, colors, buffer, params):
+        """
+        Expand the pixels of a bitmap with any number of bits per pixel a bit
+        at a time.
+
+        Args:
+            data (bytes): bitmap data, pixels bit packed
+            colors (array): color565 value of each palette index
+            buffer (bytearray): color565 buffer
+            params (array): bit offset of the first pixel, bits per pixel
+              and pixels to expand
+        """
+        param = ptr16(params)
+        bs_bit = param[0]
+        bpp = param[1]
+        pixels = param[2]
+        src = ptr8(data)
+        table = ptr16(colors)
+        dst = ptr16(buffer)
+        for d in range(pixels):
+            color_index = 0
+            for _ in range(bpp):
+                color_index = (color_index << 1) | ((src[bs_bit >> 3] >> (7 - (bs_bit & 7))) & 1)
+                bs_bit += 1
+            dst[d] = table[color_index]
+
+    def _bitmap(self, data, bs_bit, width, height, bpp, palette, x, y):
+        """
+        Internal method to draw a palette bitmap in bands of rows, each band
+        is expanded into the line buffer and sent with a single window write.
+
+        Args:
+            data (bytes or stream): bitmap data or a binary stream positioned
+              at the first pixel
+            bs_bit (int): bit offset of the first pixel in data
+            width (int): bitmap width
+            height (int): rows to draw
+            bpp (int): bits per pixel
+            palette (list): 565 encoded colors
+            x (int): column to start drawing at
+            y (int): row to start drawing at
+        """
+        stream = hasattr(data, 'readinto')
+        if not stream:
+            data = memoryview(data)
+        lut = self._bitmap_lut(palette, bpp)
+        params = self._params
+        bytewise = 8 % bpp == 0
+        params[1] = 8 // bpp if bytewise else bpp
+
+        # bands start at a byte boundary of the data
+        align = 1
+        while (width * bpp * align) & 7:
+            align <<= 1
+        line = self._line_buffer()
+        rows = min(height, len(line) // (width * 2) if line is not None else 0, 0xFFFF // width)
+        rows -= rows % align
+        if rows == 0:
+            rows = min(height, align)
+            line = memoryview(bytearray(rows * width * 2))
+
+        self.begin()
+        try:
+            row = 0
+            while row < height:
+                count = min(rows, height - row)
+                pixels = count * width
+                band = line[:pixels * 2]
+                if stream:
+                    # read the band data into the end of the band buffer
+                    nbytes = (pixels * bpp + 7) >> 3
+                    src = band[pixels * 2 - nbytes:]
+                    if data.readinto(src) != nbytes:
+                        break
+                    skip = 0
+                else:
+                    src = data[bs_bit >> 3:]
+                    skip = bs_bit & 7
+                params[2] = pixels
+                if bytewise:
+                    params[0] = skip // bpp
+                    self._expand(src, lut, band, params)
+                else:
+                    params[0] = skip
+                    self._expand_bits(src, lut, band, params)
+                self.blit_buffer(band, x, y + row, width, count)
+                bs_bit += pixels * bpp
+                row += count
+        finally:
+            self.end()
 
     def bitmap(self, bitmap, x, y, index=0):
         """
@@ -775,36 +1245,13 @@ class ST7789:
         if self.width <= to_col or self.height <= to_row:
             return
 
-        bitmap_size = height * width
-        buffer_len = bitmap_size * 2
-        bpp = bitmap.BPP
-        bs_bit = bpp * bitmap_size * index  # if index > 0 else 0
-        palette = bitmap.PALETTE
-        needs_swap = self.needs_swap
-        buffer = bytearray(buffer_len)
-
-        for i in range(0, buffer_len, 2):
-            color_index = 0
-            for _ in range(bpp):
-                color_index = (color_index << 1) | (
-                    (bitmap.BITMAP[bs_bit >> 3] >> (7 - (bs_bit & 7))) & 1
-                )
-                bs_bit += 1
-
-            color = palette[color_index]
-            if needs_swap:
-                buffer[i] = color & 0xFF
-                buffer[i + 1] = color >> 8
-            else:
-                buffer[i] = color >> 8
-                buffer[i + 1] = color & 0xFF
-
-        self._set_window(x, y, to_col, to_row)
-        self._write(None, buffer)
+        bs_bit = bitmap.BPP * height * width * index  # if index > 0 else 0
+        self._bitmap(bitmap.BITMAP, bs_bit, width, height, bitmap.BPP, bitmap.PALETTE, x, y)
 
     def pbitmap(self, bitmap, x, y, index=0):
         """
-        Draw a bitmap on display at the specified column and row one row at a time
+        Draw a bitmap on display at the specified column and row, rows below
+        the display are clipped
 
         Args:
             bitmap (bitmap_module): The module containing the bitmap to draw
@@ -815,41 +1262,111 @@ class ST7789:
 
         """
         width = bitmap.WIDTH
-        height = bitmap.HEIGHT
-        bitmap_size = height * width
-        bpp = bitmap.BPP
-        bs_bit = bpp * bitmap_size * index  # if index > 0 else 0
-        palette = bitmap.PALETTE
-        needs_swap = self.needs_swap
-        buffer = bytearray(bitmap.WIDTH * 2)
-
-        for row in range(height):
-            for col in range(width):
-                color_index = 0
-                for _ in range(bpp):
-                    color_index <<= 1
-                    color_index |= (
-                        bitmap.BITMAP[bs_bit // 8] & 1 << (7 - (bs_bit % 8))
-                    ) > 0
-                    bs_bit += 1
-                color = palette[color_index]
-                if needs_swap:
-                    buffer[col * 2] = color & 0xFF
-                    buffer[col * 2 + 1] = color >> 8 & 0xFF
-                else:
-                    buffer[col * 2] = color >> 8 & 0xFF
-                    buffer[col * 2 + 1] = color & 0xFF
+        height = min(bitmap.HEIGHT, self.height - y)
+        if self.width <= x + width - 1 or height <= 0:
+            return
 
-            to_col = x + width - 1
-            to_row = y + row
-            if self.width > to_col and self.height > to_row:
-                self._set_window(x, y + row, to_col, to_row)
-                self._write(None, buffer)
+        bs_bit = bitmap.BPP * bitmap.HEIGHT * width * index  # if index > 0 else 0
+        self._bitmap(bitmap.BITMAP, bs_bit, width, height, bitmap.BPP, bitmap.PALETTE, x, y)
+
+    def bitmap_file(self, stream, x, y, width, height, bpp, palette):
+        """
+        Draw a bitmap streamed from a binary file at the specified column and
+        row, rows below the display are clipped. The file data is read in
+        bands with readinto, no buffer for the whole bitmap is allocated.
+
+        Example:
+
+            with open('image.bin', 'rb') as stream:
+                tft.bitmap_file(stream, 0, 0, 240, 320, 4, image.PALETTE)
+
+        Args:
+            stream (file): binary file positioned at the first pixel, pixels
+                bit packed like the BITMAP of a bitmap module
+            x (int): column to start drawing at
+            y (int): row to start drawing at
+            width (int): bitmap width
+            height (int): bitmap height
+            bpp (int): bits per pixel
+            palette (list): 565 encoded colors
+        """
+        height = min(height, self.height - y)
+        if self.width <= x + width - 1 or height <= 0:
+            return
+
+        self._bitmap(stream, 0, width, height, bpp, palette, x, y)
+
+    def _font_index(self, font):
+        """
+        Return the glyph index of a converted true-type font, the index is
+        built on first use.
+
+        Args:
+            font (font): The module containing the converted true-type font
+
+        Returns:
+            tuple: first code point, bit offset and width of each code point
+            from the first to the last code point in font.MAP, width 0 if the
+            character is not in the font
+        """
+        index = self._fonts.get(font)
+        if index is not None:
+            return index
+
+        first = min(ord(char) for char in font.MAP)
+        last = max(ord(char) for char in font.MAP)
+        offsets = array('L', [0] * (last - first + 1))
+        widths = bytearray(last - first + 1)
+        offset_width = font.OFFSET_WIDTH
+        for char_index, char in enumerate(font.MAP):
+            offset = char_index * offset_width
+            bs_bit = 0
+            for i in range(offset_width):
+                bs_bit = (bs_bit << 8) + font.OFFSETS[offset + i]
+            offsets[ord(char) - first] = bs_bit
+            widths[ord(char) - first] = font.WIDTHS[char_index]
+        index = (first, offsets, widths)
+        self._fonts[font] = index
+        return index
+
+    @micropython.viper
+    @staticmethod
+    def _unpack(bitmaps, bs_bit: int, params, buffer):
+        """
+        Unpack a character of a converted true-type font into a line buffer.
+
+        Args:
+            bitmaps (bytes): font bitmap, rows of a character are bit packed
+            bs_bit (int): bit offset of the character
+            params (array): foreground and background color in display byte
+              order, first column of the character in the line, line width,
+              character width and rows
+            buffer (bytearray): line buffer
+        """
+        param = ptr16(params)
+        fg_color = param[0]
+        bg_color = param[1]
+        col = param[2]
+        stride = param[3]
+        width = param[4]
+        rows = param[5]
+        bitmap = ptr8(bitmaps)
+        dst = ptr16(buffer)
+        d = col
+        for _ in range(rows):
+            for c in range(width):
+                if bitmap[bs_bit >> 3] & (0x80 >> (bs_bit & 7)):
+                    dst[d + c] = fg_color
+                else:
+                    dst[d + c] = bg_color
+                bs_bit += 1
+            d += stride
 
     def write(self, font, string, x, y, fg=WHITE, bg=BLACK):
         """
         Write a string using a converted true-type font on the display starting
-        at the specified column and row
+        at the specified column and row. Consecutive characters are unpacked
+        into the line buffer and sent with a single window write.
 
         Args:
             font (font): The module containing the converted true-type font
@@ -859,48 +1376,59 @@ class ST7789:
             fg (int): foreground color, optional, defaults to WHITE
             bg (int): background color, optional, defaults to BLACK
         """
-        buffer_len = font.HEIGHT * font.MAX_WIDTH * 2
-        buffer = bytearray(buffer_len)
-        fg_hi = fg >> 8
-        fg_lo = fg & 0xFF
-
-        bg_hi = bg >> 8
-        bg_lo = bg & 0xFF
-
-        for character in string:
-            try:
-                char_index = font.MAP.index(character)
-                offset = char_index * font.OFFSET_WIDTH
-                bs_bit = font.OFFSETS[offset]
-                if font.OFFSET_WIDTH > 1:
-                    bs_bit = (bs_bit << 8) + font.OFFSETS[offset + 1]
-
-                if font.OFFSET_WIDTH > 2:
-                    bs_bit = (bs_bit << 8) + font.OFFSETS[offset + 2]
-
-                char_width = font.WIDTHS[char_index]
-                buffer_needed = char_width * font.HEIGHT * 2
-
-                for i in range(0, buffer_needed, 2):
-                    if font.BITMAPS[bs_bit // 8] & 1 << (7 - (bs_bit % 8)) > 0:
-                        buffer[i] = fg_hi
-                        buffer[i + 1] = fg_lo
-                    else:
-                        buffer[i] = bg_hi
-                        buffer[i + 1] = bg_lo
-
-                    bs_bit += 1
-
-                to_col = x + char_width - 1
-                to_row = y + font.HEIGHT - 1
-                if self.width > to_col and self.height > to_row:
-                    self._set_window(x, y, to_col, to_row)
-                    self._write(None, buffer[:buffer_needed])
-
-                x += char_width
-
-            except ValueError:
-                pass
+        height = font.HEIGHT
+        if y + height > self.height:
+            return
+        first, offsets, widths = self._font_index(font)
+        count = len(widths)
+
+        # characters wider than the line buffer are sent one at a time
+        line = self._line_buffer()
+        limit = len(line) // (height * 2) if line is not None else 0
+        if limit < font.MAX_WIDTH:
+            line = memoryview(bytearray(height * font.MAX_WIDTH * 2))
+            limit = font.MAX_WIDTH
+
+        params = self._params
+        params[0] = fg if self.needs_swap else ((fg << 8) & 0xFF00) | (fg >> 8)
+        params[1] = bg if self.needs_swap else ((bg << 8) & 0xFF00) | (bg >> 8)
+        params[5] = height
+
+        self.begin()
+        try:
+            length = len(string)
+            i = 0
+            while i < length:
+                # measure the run of characters that fits the line buffer
+                stride = 0
+                j = i
+                while j < length:
+                    code = ord(string[j]) - first
+                    char_width = widths[code] if 0 <= code < count else 0
+                    if stride + char_width > limit or x + stride + char_width > self.width:
+                        break
+                    stride += char_width
+                    j += 1
+                if j == i:
+                    break
+                if stride == 0:
+                    i = j
+                    continue
+
+                params[3] = stride
+                col = 0
+                for k in range(i, j):
+                    code = ord(string[k]) - first
+                    if 0 <= code < count and widths[code]:
+                        params[2] = col
+                        params[4] = widths[code]
+                        self._unpack(font.BITMAPS, offsets[code], params, line)
+                        col += widths[code]
+                self.blit_buffer(line[:stride * height * 2], x, y, stride, height)
+                x += stride
+                i = j
+        finally:
+            self.end()
 
     def write_width(self, font, string):
         """
@@ -915,32 +1443,21 @@ class ST7789:
             int: The width of the string in pixels
 
         """
+        first, offsets, widths = self._font_index(font)
+        count = len(widths)
         width = 0
         for character in string:
-            try:
-                char_index = font.MAP.index(character)
-                width += font.WIDTHS[char_index]
-            except ValueError:
-                pass
+            code = ord(character) - first
+            if 0 <= code < count:
+                width += widths[code]
 
         return width
 
-    @micropython.native
-    def polygon(self, points, x, y, color, angle=0, center_x=0, center_y=0):
+    @staticmethod
+    def _polygon_points(points, x, y, angle, center_x, center_y):
         """
-        Draw a polygon on the display.
-
-        Args:
-            points (list): List of points to draw.
-            x (int): X-coordinate of the polygon's position.
-            y (int): Y-coordinate of the polygon's position.
-            color (int): 565 encoded color.
-            angle (float): Rotation angle in radians (default: 0).
-            center_x (int): X-coordinate of the rotation center (default: 0).
-            center_y (int): Y-coordinate of the rotation center (default: 0).
-
-        Raises:
-            ValueError: If the polygon has less than 3 points.
+        Return the points of a polygon moved to x, y and rotated by angle
+        around center_x, center_y.
         """
         if len(points) < 3:
             raise ValueError("Polygon must have at least 3 points.")
@@ -948,7 +1465,7 @@ class ST7789:
         if angle:
             cos_a = cos(angle)
             sin_a = sin(angle)
-            rotated = [
+            return [
                 (
                     x
                     + center_x
@@ -963,14 +1480,94 @@ class ST7789:
                 )
                 for point in points
             ]
-        else:
-            rotated = [(x + int((point[0])), y + int((point[1]))) for point in points]
-
-        for i in range(1, len(rotated)):
-            self.line(
-                rotated[i - 1][0],
-                rotated[i - 1][1],
-                rotated[i][0],
-                rotated[i][1],
-                color,
-            )
+        return [(x + int((point[0])), y + int((point[1]))) for point in points]
+
+    @micropython.native
+    def polygon(self, points, x, y, color, angle=0, center_x=0, center_y=0):
+        """
+        Draw a polygon on the display.
+
+        Args:
+            points (list): List of points to draw.
+            x (int): X-coordinate of the polygon's position.
+            y (int): Y-coordinate of the polygon's position.
+            color (int): 565 encoded color.
+            angle (float): Rotation angle in radians (default: 0).
+            center_x (int): X-coordinate of the rotation center (default: 0).
+            center_y (int): Y-coordinate of the rotation center (default: 0).
+
+        Raises:
+            ValueError: If the polygon has less than 3 points.
+        """
+        rotated = self._polygon_points(points, x, y, angle, center_x, center_y)
+
+        self.begin()
+        try:
+            for i in range(1, len(rotated)):
+                self.line(
+                    rotated[i - 1][0],
+                    rotated[i - 1][1],
+                    rotated[i][0],
+                    rotated[i][1],
+                    color,
+                )
+        finally:
+            self.end()
+
+    def fill_polygon(self, points, x, y, color, angle=0, center_x=0, center_y=0):
+        """
+        Draw a filled polygon on the display. The polygon is closed, each
+        pixel row is filled with horizontal spans between the edge crossings
+        (even-odd rule), each span is a single window write. Bottom
+        vertices are filled as in polygon(). Rows are clipped to the
+        display.
+
+        Args:
+            points (list): List of points of the polygon.
+            x (int): X-coordinate of the polygon's position.
+            y (int): Y-coordinate of the polygon's position.
+            color (int): 565 encoded color.
+            angle (float): Rotation angle in radians (default: 0).
+            center_x (int): X-coordinate of the rotation center (default: 0).
+            center_y (int): Y-coordinate of the rotation center (default: 0).
+
+        Raises:
+            ValueError: If the polygon has less than 3 points.
+        """
+        rotated = self._polygon_points(points, x, y, angle, center_x, center_y)
+        count = len(rotated)
+        y_min = max(0, min(point[1] for point in rotated))
+        y_max = min(self.height - 1, max(point[1] for point in rotated))
+        nodes = []
+
+        self.begin()
+        try:
+            for row in range(y_min, y_max + 1):
+                del nodes[:]
+                px1, py1 = rotated[count - 1]
+                for i in range(count):
+                    px2, py2 = rotated[i]
+                    if (py1 <= row < py2) or (py2 <= row < py1):
+                        nodes.append(px1 + (row - py1) * (px2 - px1) // (py2 - py1))
+                    elif py1 == py2 == row:
+                        # horizontal edge
+                        self._span(min(px1, px2), max(px1, px2), row, color)
+                    if py2 == row and py1 < row and rotated[i + 1 - count][1] < row:
+                        # bottom vertex, excluded by the half-open crossings
+                        self._span(px2, px2, row, color)
+                    px1, py1 = px2, py2
+                nodes.sort()
+                for i in range(0, len(nodes) - 1, 2):
+                    self._span(nodes[i], nodes[i + 1], row, color)
+        finally:
+            self.end()
+
+    def _span(self, x0, x1, y, color):
+        """
+        Internal method to draw the pixels x0 to x1 of row y clipped to the
+        display.
+        """
+        x0 = max(x0, 0)
+        x1 = min(x1, self.width - 1)
+        if x0 <= x1:
+            self.fill_rect(x0, y, x1 - x0 + 1, 1, color)
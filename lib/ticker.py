@@ -0,0 +1,137 @@
+# hardware vertical scroll ticker for the ST7789 and ST7735 drivers
+#
+# A band of screen rows is defined as the vertical scroll area of the
+# display. Each new line of text is rendered once into an off-screen tile.
+# A scroll step writes only the rows that are newly exposed at the bottom
+# of the band (into the frame memory lines that leave the top of the band)
+# and advances the hardware scroll pointer. The rest of the band is not
+# redrawn, an idle ticker does not use the bus.
+#
+#   ticker = Ticker(display, 280, 40, display.WHITE, display.BLACK)
+#   ticker.add('NTP sync ok')
+#   ticker.add('192.168.1.20')
+#   per frame: ticker.step()
+#   ticker.close()                  restore the full screen scroll area
+#
+# Configuration
+#   y           - first screen row of the scroll band
+#   height      - rows of the scroll band
+#   fcolor      - text color
+#   bcolor      - background color
+#   line_height - rows per text line, 10 if not defined
+#   speed       - rows scrolled per step, 1 if not defined (smooth), use
+#                 line_height to scroll a whole line per step (log)
+#   max_lines   - pending lines kept, the oldest are dropped, 8 if not defined
+#
+# Notes
+#   Text is drawn with the built-in 8x8 framebuf font, longer lines are
+#   clipped at the right edge of the screen.
+#   The scroll direction follows the frame memory lines, screen rows must
+#   map to frame memory lines (rotation 0). The band is defined in frame
+#   memory lines including the row offset of the display.
+#   Other drawing in the band is scrolled with the band, draw outside of
+#   the band or call clear() afterwards.
+
+from tile import Tile
+
+# frame memory lines of the controllers
+_ST7789_LINES = 320
+_ST7735_LINES = 162
+
+class Ticker:
+    def __init__(self, display, y, height, fcolor, bcolor, line_height=10, speed=1, max_lines=8):
+        if 'size' in dir(display):
+            width = display.size[0]
+        else:
+            width = display.width
+        self.display = display
+        self.y = y
+        self.height = height
+        self.fcolor = fcolor
+        self.bcolor = bcolor
+        self.line_height = line_height
+        self.speed = speed
+        self.max_lines = max_lines
+        self.tile = Tile(display, width, line_height)
+        self.st7789 = 'vscrdef' in dir(display)
+        # pending lines, scroll offset in the band, next row of the current
+        # line (None if no line is scrolled in)
+        self.lines = []
+        self.pos = 0
+        self.row = None
+        # statistics
+        self.dropped = 0
+        self.rows = 0
+        if self.st7789:
+            top = display.ystart + y
+            display.vscrdef(top, height, _ST7789_LINES - top - height)
+        else:
+            top = display.offset[1] + y
+            display.setvscroll(top, _ST7735_LINES - top - height)
+        self.top = top
+        self.clear()
+
+    # Clear the band and reset the scroll position, pending lines are kept
+    def clear(self):
+        tile = self.tile
+        width = tile.width
+        tile.compose(0, self.y, width, self.height, lambda t: None, self.bcolor)
+        tile.move(0, 0, width, self.line_height)
+        self.row = None
+        self._scroll(0)
+
+    # Queue a line of text
+    def add(self, text):
+        if len(self.lines) >= self.max_lines:
+            self.lines.pop(0)
+            self.dropped += 1
+        self.lines.append(text)
+
+    # Return True while lines are scrolled in or pending
+    def busy(self):
+        return self.row is not None or len(self.lines) > 0
+
+    # Scroll by speed rows, render the next pending line when the current
+    # line is complete. Return True if the band was scrolled.
+    def step(self):
+        count = self.speed
+        scrolled = False
+        while count > 0:
+            if self.row is None:
+                if not self.lines:
+                    break
+                tile = self.tile
+                tile.fill(self.bcolor)
+                tile.text(self.lines.pop(0), tile.x + 2, tile.y + (self.line_height - 8) // 2,
+                          self.fcolor)
+                self.row = 0
+            # rows of the current line up to the end of the band
+            rows = min(count, self.line_height - self.row, self.height - self.pos)
+            self.tile.flush_rows(self.row, rows, self.y + self.pos)
+            self.row += rows
+            if self.row >= self.line_height:
+                self.row = None
+            self.pos = (self.pos + rows) % self.height
+            self.rows += rows
+            count -= rows
+            scrolled = True
+        if scrolled:
+            self._scroll(self.pos)
+        return scrolled
+
+    # Restore the full screen scroll area
+    def close(self):
+        display = self.display
+        if self.st7789:
+            display.vscrdef(0, _ST7789_LINES, 0)
+            display.vscsad(0)
+        else:
+            display.setvscroll(0, 0)
+            display.vscroll(0)
+
+    # Set the frame memory line shown at the top of the band
+    def _scroll(self, pos):
+        if self.st7789:
+            self.display.vscsad(self.top + pos)
+        else:
+            self.display.vscroll(pos)
@@ -0,0 +1,133 @@
+# off-screen RGB565 tile compositor for the ST7789 and ST7735 drivers
+#
+# Primitives are drawn into an in-RAM RGB565 frame buffer using screen
+# coordinates and sent to the display with a single window write
+# (ST7789.blit_buffer or ST7735.image). Overlapping primitives cost one
+# window write per tile instead of one per primitive.
+#
+#   tile = Tile(display, 64, 32)
+#   tile.move(10, 20)
+#   tile.fill(bcolor)
+#   tile.fill_rect(12, 22, 20, 10, hcolor)
+#   tile.flush()
+#
+#   Regions larger than the tile are drawn in bands, draw(tile) is called
+#   once per band and must draw the whole region (clipped to the band)
+#   tile.compose(0, 0, 240, 320, draw, bcolor)
+#
+# Notes
+#   The tile buffer may be smaller than the screen, e.g. 4096 bytes for a
+#   64x32 tile. move() accepts any window with width * height pixels
+#   within the buffer size.
+#   framebuf stores RGB565 pixels in little endian byte order, colors are
+#   byte swapped unless the display expects little endian data
+#   (ST7789 needs_swap). The ST7735 always expects big endian data.
+
+import framebuf
+
+class Tile:
+    def __init__(self, display, width, height):
+        self.display = display
+        self.buffer = bytearray(width * height * 2)
+        self._mv = memoryview(self.buffer)
+        self._blit = 'blit_buffer' in dir(display)
+        self.swap = not ('needs_swap' in dir(display) and display.needs_swap)
+        self.x = 0
+        self.y = 0
+        self.width = 0
+        self.height = 0
+        self.fb = None
+        self.move(0, 0, width, height)
+
+    # Set the screen position and optionally the size of the tile window
+    def move(self, x, y, width=None, height=None):
+        width = self.width if width is None else width
+        height = self.height if height is None else height
+        if width * height * 2 > len(self.buffer):
+            raise ValueError(f'tile {width}x{height} exceeds buffer size')
+        if width != self.width or height != self.height:
+            self.fb = framebuf.FrameBuffer(self.buffer, width, height, framebuf.RGB565)
+            self.width = width
+            self.height = height
+        self.x = x
+        self.y = y
+
+    # Return the color in tile byte order
+    def color(self, color):
+        if self.swap:
+            return ((color & 0xFF) << 8) | (color >> 8)
+        return color
+
+    # Drawing primitives using screen coordinates, clipped to the tile
+    def fill(self, color):
+        self.fb.fill(self.color(color))
+
+    def pixel(self, x, y, color):
+        self.fb.pixel(x - self.x, y - self.y, self.color(color))
+
+    def hline(self, x, y, length, color):
+        self.fb.hline(x - self.x, y - self.y, length, self.color(color))
+
+    def vline(self, x, y, length, color):
+        self.fb.vline(x - self.x, y - self.y, length, self.color(color))
+
+    def line(self, x0, y0, x1, y1, color):
+        self.fb.line(x0 - self.x, y0 - self.y, x1 - self.x, y1 - self.y, self.color(color))
+
+    def rect(self, x, y, width, height, color):
+        self.fb.rect(x - self.x, y - self.y, width, height, self.color(color))
+
+    def fill_rect(self, x, y, width, height, color):
+        self.fb.fill_rect(x - self.x, y - self.y, width, height, self.color(color))
+
+    # Draw text using the built-in 8x8 framebuf font
+    def text(self, string, x, y, color):
+        self.fb.text(string, x - self.x, y - self.y, self.color(color))
+
+    # Copy another frame buffer into the tile (see FrameBuffer.blit)
+    def blit(self, fbuf, x, y, key=-1):
+        self.fb.blit(fbuf, x - self.x, y - self.y, key)
+
+    # Send the tile window to the display, the window must be on screen
+    def flush(self):
+        self.flush_rows(0, self.height, self.y)
+
+    # Send count rows of the tile starting at tile row first to screen row y
+    def flush_rows(self, first, count, y):
+        size = self.width * 2
+        data = self._mv[first * size:(first + count) * size]
+        if self._blit:
+            self.display.blit_buffer(data, self.x, y, self.width, count)
+        else:
+            self.display.image(self.x, y, self.x + self.width - 1, y + count - 1, data)
+
+    # Draw the region x, y, width, height (clipped to the screen) in bands
+    # of at most the tile size. For each band the tile is filled with
+    # bcolor (if not None), draw(tile) is called and the band is flushed.
+    def compose(self, x, y, width, height, draw, bcolor=None):
+        if 'size' in dir(self.display):
+            size = self.display.size
+        else:
+            size = (self.display.width, self.display.height)
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = min(size[0], x + width)
+        y1 = min(size[1], y + height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        pixels = len(self.buffer) // 2
+        band_w = min(x1 - x0, pixels)
+        band_h = min(y1 - y0, pixels // band_w)
+        by = y0
+        while by < y1:
+            h = min(band_h, y1 - by)
+            bx = x0
+            while bx < x1:
+                w = min(band_w, x1 - bx)
+                self.move(bx, by, w, h)
+                if bcolor is not None:
+                    self.fill(bcolor)
+                draw(self)
+                self.flush()
+                bx += w
+            by += h
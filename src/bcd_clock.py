@@ -4,7 +4,17 @@
 #   debug       - output debug information
 #   verbose     - if debug, output copious information
 #   display_rtc - if true, output RTC time directly, else RTC=UTC use genlib for DST compensation
-#   show_digits - call show() after each digit, False if not defined
+#   show_digits - commit and show() after each field, False if not defined
+#   tick_phase  - ms the frame is rendered before the RTC second turns over, 0 if not defined
+#   tick_resync - frames between realignment to the RTC second, 60 if not defined
+#   stats_interval - if debug, frames between timing statistics output, 0 (never) if not defined
+#   runtime     - "asyncio" to run render, LED, button, NTP and GC as separate tasks,
+#                 "loop" (single blocking loop) if not defined
+#   rtc_discipline - if true, learn the RTC drift and slew the displayed time between
+#                 NTP syncs, else step the RTC every hour, False if not defined
+#   idle_mode   - "lightsleep" to sleep in machine.lightsleep() between frames,
+#                 "sleep" (time.sleep) if not defined, see Notes
+#   idle_margin - if lightsleep, ms woken before the frame is due, 10 if not defined
 #   bkg_color   - color of background pixels, else "black"
 #   frame_color - color of frame pixels, else "ltgray"
 #   colon_color - color of blinking colons, else "vltgray"
@@ -17,12 +27,22 @@
 #     "red", "ltred", "green", "ltgreen", "blue", "ltblue"
 #     "cyan", "ltcyan", "magenta", ltmagenta", "yellow", "ltyellow",
 #     "black", "white", "gray", "ltgray", "vltgray", vvltgray"
+#   idle_mode "lightsleep" is only used by the "loop" runtime and only if the
+#   platform supports machine.lightsleep(). The CPU is not put to sleep while
+#   an NTP reply is pending. On platforms with native USB the serial console
+#   may be disconnected during lightsleep.
     
 import sys
 import time
+import machine
 from machine import RTC, Pin
 import gc
 import genlib as gl
+from scheduler import SecondScheduler
+from bcdrender import BCDRenderer
+from shadowgrid import ShadowGrid
+from latency import Histogram
+from discipline import RTCDiscipline
 
 print()
 
@@ -82,6 +102,38 @@ show_digits = False
 if 'show_digits' in keys:
     show_digits = cfg['show_digits']
 
+tick_phase = 0
+if 'tick_phase' in keys:
+    tick_phase = cfg['tick_phase']
+
+tick_resync = 60
+if 'tick_resync' in keys:
+    tick_resync = cfg['tick_resync']
+
+stats_interval = 0
+if 'stats_interval' in keys:
+    stats_interval = cfg['stats_interval']
+
+rtc_discipline = 'rtc_discipline' in keys and cfg['rtc_discipline']
+
+# Only import asyncio library if required
+use_asyncio = 'runtime' in keys and cfg['runtime'] == 'asyncio'
+if use_asyncio:
+    import asyncio
+
+use_lightsleep = False
+if 'idle_mode' in keys and cfg['idle_mode'] == 'lightsleep':
+    if use_asyncio:
+        print('lightsleep idle mode not supported by the asyncio runtime')
+    elif 'lightsleep' not in dir(machine):
+        print('lightsleep not supported on this platform')
+    else:
+        use_lightsleep = True
+
+idle_margin = 10
+if 'idle_margin' in keys:
+    idle_margin = cfg['idle_margin']
+
 # Initialize common hardware
 # Optional LED to show activity
 blink_cnt = 1
@@ -110,10 +162,24 @@ def btn_isr(pin):
     if pin.value() == 0:
         stop = True
 
+# asyncio runtime, the button task debounces the press
+btn_pressed = False
+def btn_flag_isr(pin):
+    global btn_pressed
+    btn_pressed = True
+
 btn = None
 if 'BTN' in keys and cfg['BTN'] != -1:
     btn = Pin(cfg['BTN'], Pin.IN, Pin.PULL_UP)
-    btn.irq(handler=btn_isr, trigger=Pin.IRQ_FALLING)
+    handler = btn_flag_isr if use_asyncio else btn_isr
+    try:
+        # Button press wakes the CPU from lightsleep if the platform supports it
+        if use_lightsleep:
+            btn.irq(handler=handler, trigger=Pin.IRQ_FALLING, wake=machine.SLEEP)
+        else:
+            btn.irq(handler=handler, trigger=Pin.IRQ_FALLING)
+    except (TypeError, ValueError):
+        btn.irq(handler=handler, trigger=Pin.IRQ_FALLING)
 
 # Seems to help sometimes...
 gc.collect()
@@ -254,216 +320,350 @@ def draw_frame():
             display.vline(x0, y0, leny, fcolor)
             display.vline(x1, y0, leny, fcolor)
         
+# Shadow model of the virtual pixels and dots, written to the display
+# once per frame by grid.commit()
+grid = ShadowGrid(display, bcolor)
+
 # Display blinking colon to separate time fields
 dots_on = True
 def blink_dots():
     global dots_on, bcolor, ccolor
 
     tmp_color = ccolor if dots_on else bcolor
-    display.dot_set(2, 1, tmp_color)
-    display.dot_set(2, 2, tmp_color)
-    display.dot_set(5, 1, tmp_color)
-    display.dot_set(5, 2, tmp_color)
+    grid.dot_set(2, 1, tmp_color)
+    grid.dot_set(2, 2, tmp_color)
+    grid.dot_set(5, 1, tmp_color)
+    grid.dot_set(5, 2, tmp_color)
     dots_on = not dots_on
 
-# Display 2 digit hour - decimal 0..23 BCD [0..2 0..9]
+# Display 2 digit fields using bit-diff BCD renderer
+#   hours   - decimal 0..23 BCD [0..2 0..9], columns 0, 1
+#   minutes - decimal 0..59 BCD [0..5 0..9], columns 3, 4
+#   seconds - decimal 0..59 BCD [0..5 0..9], columns 6, 7
 # If you want AM/PM, add it yourself ;-)
-last_hour = -1
+bcd = BCDRenderer(grid, bcolor)
+hour_field = bcd.add_field(0, hcolor)
+min_field = bcd.add_field(3, mcolor)
+sec_field = bcd.add_field(6, scolor)
+
 def update_hours(val):
-    global last_hour, hcolor, bcolor
-    if val == last_hour:
-        return
-    last_hour = val
-    
-    # Clear hour pixels
-    display.xy_set(0, 2, bcolor)
-    display.xy_set(0, 3, bcolor)
-    display.xy_set(1, 0, bcolor)
-    display.xy_set(1, 1, bcolor)
-    display.xy_set(1, 2, bcolor)
-    display.xy_set(1, 3, bcolor)
-
-    # Display tens digit (0..2)
-    if val > 19:
-        display.xy_set(0, 2, hcolor)
-    elif val > 9:
-        display.xy_set(0, 3, hcolor)
-
-    # Display ones digit (0..9)
-    val = val % 10
-    if val & 8 != 0:
-        display.xy_set(1, 0, hcolor)
-    if val & 4 != 0:
-        display.xy_set(1, 1, hcolor)
-    if val & 2 != 0:
-        display.xy_set(1, 2, hcolor)
-    if val & 1 != 0:
-        display.xy_set(1, 3, hcolor)
-
-# Display 2 digit minute - decimal 0..59 BCD [0..5 0..9]
-last_min = -1
+    bcd.update(hour_field, val)
+
 def update_minutes(val):
-    global last_min, mcolor, bcolor
-    if last_min == val:
-        return
-    last_min = val
-
-    # Clear minute pixels
-    display.xy_set(3, 1, bcolor)
-    display.xy_set(3, 2, bcolor)
-    display.xy_set(3, 3, bcolor)
-    display.xy_set(4, 0, bcolor)
-    display.xy_set(4, 1, bcolor)
-    display.xy_set(4, 2, bcolor)
-    display.xy_set(4, 3, bcolor)
-
-    # Display tens digit (0..5)
-    if val > 49 != 0:
-        display.xy_set(3, 1, mcolor)
-        display.xy_set(3, 3, mcolor)
-    elif val > 39 != 0:
-        display.xy_set(3, 1, mcolor)
-    elif val > 29 != 0:
-        display.xy_set(3, 2, mcolor)
-        display.xy_set(3, 3, mcolor)
-    elif val > 19 != 0:
-        display.xy_set(3, 2, mcolor)
-    elif val > 9 != 0:
-        display.xy_set(3, 3, mcolor)
-
-    # Display ones digit (0..9)
-    val = val % 10
-    if val & 8 != 0:
-        display.xy_set(4, 0, mcolor)
-    if val & 4 != 0:
-        display.xy_set(4, 1, mcolor)
-    if val & 2 != 0:
-        display.xy_set(4, 2, mcolor)
-    if val & 1 != 0:
-        display.xy_set(4, 3, mcolor)
-
-# Display 2 digit second - decimal 0..59 BCD [0..5 0..9]
-last_sec = -1
+    bcd.update(min_field, val)
+
 def update_seconds(val):
-    global last_sec, scolor, bcolor
-    if last_sec == val:
+    if bcd.value(sec_field) == val:
         return
-    last_sec = val
-
-    # Clear second pixels
-    display.xy_set(6, 1, bcolor)
-    display.xy_set(6, 2, bcolor)
-    display.xy_set(6, 3, bcolor)
-    display.xy_set(7, 0, bcolor)
-    display.xy_set(7, 1, bcolor)
-    display.xy_set(7, 2, bcolor)
-    display.xy_set(7, 3, bcolor)
-
-    # Display tens digit (0..5)
-    if val > 49 != 0:
-        display.xy_set(6, 1, scolor)
-        display.xy_set(6, 3, scolor)
-    elif val > 39 != 0:
-        display.xy_set(6, 1, scolor)
-    elif val > 29 != 0:
-        display.xy_set(6, 2, scolor)
-        display.xy_set(6, 3, scolor)
-    elif val > 19 != 0:
-        display.xy_set(6, 2, scolor)
-    elif val > 9 != 0:
-        display.xy_set(6, 3, scolor)
-
-    # Display ones digit (0..9)
-    val = val % 10
-    if val & 8 != 0:
-        display.xy_set(7, 0, scolor)
-    if val & 4 != 0:
-        display.xy_set(7, 1, scolor)
-    if val & 2 != 0:
-        display.xy_set(7, 2, scolor)
-    if val & 1 != 0:
-        display.xy_set(7, 3, scolor)
-
+    bcd.update(sec_field, val)
     blink_dots()
 
 # Display test for graphics fine-tuning
 def test():
-    global last_hour, last_min, last_sec, dots_on
-    last_hour = last_min = last_sec = -1
-    dots_on = True
+    global dots_on
     display.fill(bcolor)
     draw_frame()
+    display.show()
+    grid.reset()
+    bcd.reset()
+    dots_on = True
     update_hours(23)
     if show_digits:
-        display.show()
+        grid.commit()
     update_minutes(59)
     if show_digits:
-        display.show()
+        grid.commit()
     update_seconds(59)
-    display.show()
+    grid.commit()
 
 # Clear display from REPL
 def clear():
     display.clear()
 
+# Frame timing statistics
+# Latency (ms) from the RTC second boundary to the end of display.show(),
+# negative if the frame was visible before the second turned over
+latency = Histogram(low=-1000, width=10, bins=220)
+
+# Duration (us) of each update_time() phase
+PHASES = ('read', 'localtime', 'hours', 'minutes', 'seconds', 'flush')
+phase_times = [Histogram(bins=24, log=True) for _ in PHASES]
+
+# lightsleep idle mode, time (ms) woken after the requested wake time and
+# time (ms) from the wake to the end of the following frame
+oversleep = Histogram(low=-50, width=1, bins=150)
+wake_latency = Histogram(low=0, width=2, bins=100)
+
+# Output the timing statistics from REPL or debug console
+# reset - clear the statistics after output
+def stats(reset=False):
+    print(f'{gl.board} {gl.platform} {cfg["display_type"]}')
+    print(f'frames={sched.frames} wakeups={sched.wakeups} late={sched.late} syncs={sched.syncs}')
+    latency.dump('latency', 'ms')
+    # frames shown after the boundary, frames shown after the following boundary
+    print(f'latency >= 0ms: {latency.count_above(0)}, >= 1000ms: {latency.count_above(1000)}')
+    for i in range(len(PHASES)):
+        phase_times[i].dump(PHASES[i], 'us')
+    if use_lightsleep:
+        oversleep.dump('oversleep', 'ms')
+        wake_latency.dump('wake to frame', 'ms')
+    if lan is not None and lan.ntp_request is not None:
+        req = lan.ntp_request
+        print(f'ntp ok={lan.ntp_ok} failed={lan.ntp_failed} last rtt={req.rtt}ms error={req.error}')
+    if disc is not None:
+        print(f'rtc drift={disc.ppm:.2f}ppm offset={disc.offset}ms phase={sched.phase_ms}ms '
+              f'interval={disc.interval}s samples={disc.samples} steps={disc.steps} '
+              f'rejected={disc.rejected}')
+    if reset:
+        latency.reset()
+        for hist in phase_times:
+            hist.reset()
+        oversleep.reset()
+        wake_latency.reset()
+
 # Get the time and update the display
-def update_time():
+# ahead - seconds to add to the current time (frame rendered before the RTC turns over)
+def update_time(ahead=0):
+    t0 = gl.local_ticks_us()
     if display_rtc:
         # Display the RTC time directly
         lt = RTC().datetime()
+        t1 = gl.local_ticks_us()
         hours = lt[4]
         mins = lt[5]
         secs = lt[6]
+        if ahead:
+            day_secs = (hours * 3600 + mins * 60 + secs + ahead) % 86400
+            hours = day_secs // 3600
+            mins = day_secs // 60 % 60
+            secs = day_secs % 60
     else:
         # Assume RTC time is UTC, get local time using genlib
-        lt = gl.localtime()
+        utc = time.time() + ahead
+        t1 = gl.local_ticks_us()
+        lt = gl.localtime(secs=utc)
         hours = lt[3]
         mins = lt[4]
         secs = lt[5]
+    t2 = gl.local_ticks_us()
     update_hours(hours)
     if show_digits:
-        display.show()
+        grid.commit()
+    t3 = gl.local_ticks_us()
     update_minutes(mins)
     if show_digits:
-        display.show()
+        grid.commit()
+    t4 = gl.local_ticks_us()
     update_seconds(secs)
-    display.show()
-
-# main loop sleep time (seconds)
-loop_delay = 0.1
+    t5 = gl.local_ticks_us()
+    grid.commit()
+    t6 = gl.local_ticks_us()
+    phase_times[0].add(gl.local_ticks_diff(t1, t0))
+    phase_times[1].add(gl.local_ticks_diff(t2, t1))
+    phase_times[2].add(gl.local_ticks_diff(t3, t2))
+    phase_times[3].add(gl.local_ticks_diff(t4, t3))
+    phase_times[4].add(gl.local_ticks_diff(t5, t4))
+    phase_times[5].add(gl.local_ticks_diff(t6, t5))
 
 # update RTC periodically (seconds)
 rtc_interval = 60 * 60
-rtc_counter = rtc_interval / loop_delay
 
 # do periodic garbage collection (seconds)
 collect_interval = 300
-collect_counter = collect_interval / loop_delay
+
+# Render once per RTC second, sleep in between
+sched = SecondScheduler(phase_ms=tick_phase, resync=tick_resync)
+
+# Optional RTC drift discipline, replaces the hourly RTC update
+disc = None
+if lan is not None and rtc_discipline:
+    disc = RTCDiscipline(phase_ms=tick_phase)
+
+# Record the RTC offset of the last NTP reply, step the RTC if necessary
+def ntp_sample():
+    req = lan.ntp_request
+    rtc = sched.rtc_time(req.received)
+    if rtc is None:
+        disc.failed(req.received)
+        return
+    offset = (req.utc - rtc[0]) * 1000 + req.ms - rtc[1]
+    if debug:
+        print(f'RTC offset {offset}ms')
+    if disc.update(offset, req.received, req.rtt):
+        if debug:
+            print('Stepping RTC')
+        lan.step_rtc()
+        sched.sync()
+
+# Render the frame due and record its latency
+frame_cnt = 0
+def render(ahead):
+    global frame_cnt
+    update_time(ahead)
+    latency.add(gl.local_ticks_diff(gl.local_ticks_ms(), sched.target))
+    frame_cnt += 1
+    if disc is not None:
+        sched.phase_ms = disc.phase(gl.local_ticks_ms())
+    if debug and stats_interval > 0 and frame_cnt % stats_interval == 0:
+        stats()
+
+# NTP reply polling interval between frames (ms)
+ntp_poll_ms = 20
+
+# Sleep delay ms between frames, use lightsleep if enabled and the delay
+# exceeds the wake margin, the remaining ms are slept awake
+wake_tick = None
+def idle(delay):
+    global wake_tick
+    if use_lightsleep and delay > idle_margin:
+        sleep_ms = delay - idle_margin
+        start = gl.local_ticks_ms()
+        machine.lightsleep(sleep_ms)
+        wake_tick = gl.local_ticks_ms()
+        oversleep.add(gl.local_ticks_diff(wake_tick, start) - sleep_ms)
+        return
+    time.sleep(delay / 1000)
+
+# Legacy runtime, rendering and housekeeping in a single loop
+# The RTC update is sent after a frame, the reply is awaited between frames
+# in the socket poll, so the reply is time stamped on arrival
+def run_loop():
+    global wake_tick
+    while not stop:
+        ahead = sched.poll()
+        if ahead is None:
+            delay = sched.delay()
+            if lan is not None and lan.ntp_pending():
+                result = lan.ntp_poll(min(delay, ntp_poll_ms), disc is None)
+                if result and disc is not None:
+                    ntp_sample()
+                elif result:
+                    sched.sync()
+                elif result is not None and disc is not None:
+                    disc.failed(gl.local_ticks_ms())
+                continue
+            idle(delay)
+            continue
+        render(ahead)
+        if wake_tick is not None:
+            wake_latency.add(gl.local_ticks_diff(gl.local_ticks_ms(), wake_tick))
+            wake_tick = None
+        # Housekeeping after the frame has been rendered
+        if disc is not None:
+            now = gl.local_ticks_ms()
+            if not lan.ntp_pending() and disc.due(now) and sched.rtc_time(now) is not None:
+                if debug:
+                    print('Measuring RTC offset')
+                if not lan.ntp_start():
+                    disc.failed(gl.local_ticks_ms())
+        elif frame_cnt % rtc_interval == 0:
+            if debug:
+                print('Updating RTC')
+            if lan is not None:
+                lan.ntp_start()
+        if frame_cnt % collect_interval == 0:
+            if debug:
+                print('Garbage collection')
+            gc.collect()
+
+# asyncio runtime tasks, only the render task touches the display
+blink_requests = 0
+
+async def render_task():
+    while not stop:
+        ahead = sched.poll()
+        if ahead is None:
+            await asyncio.sleep(sched.delay() / 1000)
+            continue
+        render(ahead)
+
+# Blink the LED blink_cnt times per request
+async def led_task():
+    global blink_requests, blink_cnt
+    while not stop:
+        if blink_requests > 0 and led is not None:
+            blink_requests -= 1
+            cnt = blink_cnt
+            while cnt > 0:
+                led.on()
+                await asyncio.sleep(0.2)
+                led.off()
+                await asyncio.sleep(0.2)
+                cnt -= 1
+            blink_cnt += 1
+        else:
+            await asyncio.sleep(0.1)
+
+# Stop if the button is still pressed 50 ms after the falling edge
+async def button_task():
+    global btn_pressed, stop
+    while not stop:
+        if btn_pressed:
+            await asyncio.sleep(0.05)
+            btn_pressed = False
+            if btn.value() == 0:
+                stop = True
+        await asyncio.sleep(0.02)
+
+async def ntp_task():
+    global blink_requests
+    while not stop:
+        if disc is None:
+            await asyncio.sleep(rtc_interval)
+            if debug:
+                print('Updating RTC')
+            if await lan.update_rtc_async():
+                sched.sync()
+                blink_requests += 1
+            continue
+        now = gl.local_ticks_ms()
+        if not disc.due(now) or sched.rtc_time(now) is None:
+            await asyncio.sleep(1)
+            continue
+        if debug:
+            print('Measuring RTC offset')
+        if await lan.update_rtc_async(apply=False):
+            ntp_sample()
+        else:
+            disc.failed(gl.local_ticks_ms())
+
+async def gc_task():
+    while not stop:
+        await asyncio.sleep(collect_interval)
+        if debug:
+            print('Garbage collection')
+        gc.collect()
+
+async def run_tasks():
+    tasks = [asyncio.create_task(gc_task())]
+    if led is not None:
+        tasks.append(asyncio.create_task(led_task()))
+    if btn is not None:
+        tasks.append(asyncio.create_task(button_task()))
+    if lan is not None:
+        tasks.append(asyncio.create_task(ntp_task()))
+    await render_task()
+    for task in tasks:
+        task.cancel()
 
 # Program loop
 if debug:
-    print('Starting clock loop')
+    print('Starting asyncio tasks' if use_asyncio else 'Starting clock loop')
     
 # Main loop started
-blink()
+if use_asyncio:
+    blink_requests += 1
+else:
+    blink()
 
 try:
     display.fill(bcolor)
     draw_frame()
-    loop_cnt = 0
-    while not stop:
-        loop_cnt += 1
-        if loop_cnt % rtc_counter == 0:
-            if debug:
-                print('Updating RTC')
-            if lan is not None and not lan.update_rtc():
-                print('RTC update failed')
-        if loop_cnt % collect_counter == 0:
-            if debug:
-                print('Garbage collection')
-            gc.collect()
-        update_time()
-        time.sleep(loop_delay)
+    display.show()
+    if use_asyncio:
+        asyncio.run(run_tasks())
+    else:
+        run_loop()
 except KeyboardInterrupt:
     pass
 finally:
@@ -474,5 +674,7 @@ finally:
     if lan is not None:
         lan.disconnect()
     display.clear()
+    if debug:
+        stats()
 
 print('Done')